@@ -0,0 +1,1004 @@
+"""
+Stand-in for the Sentry web API and ingestion endpoints used by the scripts in
+this repo, for load testing them offline. Implements Link header cursor
+pagination, X-Sentry-Rate-Limit-* headers with 429s, and can inject latency
+and failures.
+
+Usage: python fake_sentry/server.py [--port=9000] [--issues=1000] [--latency-ms=0] ...
+(See fake_sentry/README.md)
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, urlencode
+from datetime import datetime, timezone
+import threading
+import random
+import time
+import gzip
+import json
+import math
+import zlib
+import re
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data import Dataset
+
+ID_SEGMENT = re.compile(r"/(\d+|[0-9a-f]{32}|[0-9a-f-]{36})(?=/)")
+SEARCH_TOKEN = re.compile(r'(\S+?):(\[[^\]]*\]|"[^"]*"|\S+)')
+SCIM_LIST_SCHEMA = "urn:ietf:params:scim:api:messages:2.0:ListResponse"
+SCIM_USER_SCHEMA = "urn:ietf:params:scim:schemas:core:2.0:User"
+SCIM_GROUP_SCHEMA = "urn:ietf:params:scim:schemas:core:2.0:Group"
+
+ROUTES = [
+    ("GET", r"projects/", "list_projects"),
+    ("GET", r"organizations/(?P<org>[^/]+)/projects/", "list_org_projects"),
+    ("GET", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/", "get_project"),
+    ("PUT", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/", "update_project"),
+    ("GET", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/issues/", "list_issues"),
+    ("GET", r"issues/(?P<issue_id>[^/]+)/", "get_issue"),
+    ("PUT", r"issues/(?P<issue_id>[^/]+)/", "update_issue"),
+    ("GET", r"issues/(?P<issue_id>[^/]+)/events/latest/", "get_latest_event"),
+    ("GET", r"issues/(?P<issue_id>[^/]+)/first-last-release/", "get_releases"),
+    ("GET", r"groups/(?P<issue_id>[^/]+)/integrations/", "list_issue_integrations"),
+    ("PUT", r"groups/(?P<issue_id>[^/]+)/integrations/(?P<integration_id>[^/]+)/", "link_external_issue"),
+    ("GET", r"organizations/(?P<org>[^/]+)/integrations/", "list_integrations"),
+    ("GET", r"organizations/(?P<org>[^/]+)/events/", "discover"),
+    ("GET", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/events/", "list_project_events"),
+    ("GET", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/events/(?P<event_id>[^/]+)/", "get_project_event"),
+    ("GET", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/tags/(?P<key>[^/]+)/", "get_tag_key"),
+    ("GET", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/tags/(?P<key>[^/]+)/values/", "list_tag_values"),
+    ("GET", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/combined-rules/", "list_combined_rules"),
+    ("POST", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/rules/", "create_rule"),
+    ("PUT", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/rules/(?P<rule_id>[^/]+)/", "update_rule"),
+    ("DELETE", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/rules/(?P<rule_id>[^/]+)/", "delete_rule"),
+    ("POST", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/alert-rules/", "create_alert_rule"),
+    ("PUT", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/alert-rules/(?P<rule_id>[^/]+)/", "update_alert_rule"),
+    ("DELETE", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/alert-rules/(?P<rule_id>[^/]+)/", "delete_alert_rule"),
+    ("GET", r"organizations/(?P<org>[^/]+)/teams/", "list_teams"),
+    ("POST", r"organizations/(?P<org>[^/]+)/teams/", "create_team"),
+    ("GET", r"teams/(?P<org>[^/]+)/(?P<team>[^/]+)/members/", "list_team_members"),
+    ("POST", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/teams/(?P<team>[^/]+)/", "add_project_team"),
+    ("GET", r"organizations/(?P<org>[^/]+)/members/", "list_members"),
+    ("GET", r"organizations/(?P<org>[^/]+)/users/", "list_members"),
+    ("POST", r"organizations/(?P<org>[^/]+)/members/(?P<member_id>[^/]+)/teams/(?P<team>[^/]+)/", "add_member_team"),
+    ("GET", r"organizations/(?P<org>[^/]+)/scim/v2/Users/?", "list_scim_users"),
+    ("POST", r"organizations/(?P<org>[^/]+)/scim/v2/Users/?", "create_scim_user"),
+    ("GET", r"organizations/(?P<org>[^/]+)/scim/v2/Groups/?", "list_scim_groups"),
+    ("GET", r"organizations/(?P<org>[^/]+)/scim/v2/Groups/(?P<team_id>[^/]+)/?", "get_scim_group"),
+    ("PATCH", r"organizations/(?P<org>[^/]+)/scim/v2/Groups/(?P<team_id>[^/]+)/?", "update_scim_group"),
+    ("GET", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/keys/", "list_keys"),
+    ("PUT", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/keys/(?P<key_id>[^/]+)/", "update_key"),
+    ("GET", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/filters/", "list_filters"),
+    ("PUT", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/filters/(?P<filter_id>[^/]+)/", "update_filter"),
+    ("GET", r"projects/(?P<org>[^/]+)/(?P<project>[^/]+)/environments/", "list_environments")
+]
+API_ROUTES = [(method, re.compile(f'^/api/0/{pattern}$'), name) for method, pattern, name in ROUTES]
+INGEST_ROUTES = [
+    ("POST", re.compile(r"^/api/(?P<project_id>\d+)/store/$"), "store"),
+    ("POST", re.compile(r"^/api/(?P<project_id>\d+)/envelope/$"), "envelope")
+]
+
+class HttpError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+def get_endpoint_group(path):
+    return ID_SEGMENT.sub("/{id}", path)
+
+def parse_date(value):
+    value = value.strip('"').replace("Z", "")
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo = timezone.utc)
+    return parsed
+
+def parse_search(query):
+    """
+    Splits an issue/discover search into (key, operator, values) terms (E.g `lastSeen:>=2023-01-01`, `id:[a,b]`)
+    """
+    terms = []
+    for key, value in SEARCH_TOKEN.findall(query or ""):
+        operator = ""
+        for candidate in [">=", "<=", ">", "<"]:
+            if value.startswith(candidate):
+                operator = candidate
+                value = value[len(candidate):]
+                break
+        if value.startswith("[") and value.endswith("]"):
+            values = [item.strip().strip('"') for item in value[1:-1].split(",") if item.strip() != ""]
+        else:
+            values = [value.strip('"')]
+        terms.append((key, operator, values))
+    return terms
+
+class Stats:
+    """
+    Requests served per route: count, status codes, bytes in/out and total time
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+
+    def record(self, route, status, bytes_in, bytes_out, elapsed):
+        with self.lock:
+            stats = self.routes.get(route)
+            if stats is None:
+                stats = self.routes.setdefault(route, { "requests" : 0, "statuses" : {}, "bytes_in" : 0, "bytes_out" : 0, "seconds" : 0 })
+            stats["requests"] += 1
+            stats["statuses"][str(status)] = stats["statuses"].get(str(status), 0) + 1
+            stats["bytes_in"] += bytes_in
+            stats["bytes_out"] += bytes_out
+            stats["seconds"] += elapsed
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps(self.routes))
+
+    def reset(self):
+        with self.lock:
+            self.routes = {}
+
+class RateLimiter:
+    """
+    Fixed window request budget and concurrent request limit per endpoint group,
+    reported with the same headers sentry.io sends
+    """
+
+    def __init__(self, limit = None, window = 1, concurrent_limit = None):
+        self.limit = limit
+        self.window = window
+        self.concurrent_limit = concurrent_limit
+        self.lock = threading.Lock()
+        self.windows = {}
+        self.in_flight = {}
+
+    def acquire(self, group):
+        """
+        Returns (allowed, headers)
+        """
+        now = time.time()
+        headers = {}
+        with self.lock:
+            if self.concurrent_limit is not None:
+                in_flight = self.in_flight.get(group, 0)
+                headers["X-Sentry-Rate-Limit-ConcurrentLimit"] = str(self.concurrent_limit)
+                headers["X-Sentry-Rate-Limit-ConcurrentRemaining"] = str(max(self.concurrent_limit - in_flight - 1, 0))
+                if in_flight >= self.concurrent_limit:
+                    headers["Retry-After"] = "1"
+                    return False, headers
+
+            if self.limit is not None:
+                window = self.windows.get(group)
+                if window is None or window["reset"] <= now:
+                    window = { "reset" : (math.floor(now / self.window) + 1) * self.window, "count" : 0 }
+                    self.windows[group] = window
+                headers["X-Sentry-Rate-Limit-Limit"] = str(self.limit)
+                headers["X-Sentry-Rate-Limit-Reset"] = str(int(math.ceil(window["reset"])))
+                if window["count"] >= self.limit:
+                    headers["X-Sentry-Rate-Limit-Remaining"] = "0"
+                    headers["Retry-After"] = str(max(int(math.ceil(window["reset"] - now)), 1))
+                    return False, headers
+                window["count"] += 1
+                headers["X-Sentry-Rate-Limit-Remaining"] = str(self.limit - window["count"])
+
+            self.in_flight[group] = self.in_flight.get(group, 0) + 1
+        return True, headers
+
+    def release(self, group):
+        with self.lock:
+            self.in_flight[group] = self.in_flight.get(group, 1) - 1
+
+class FakeSentry:
+    """
+    Fake Sentry server. Serves one org on both the on-prem and the SaaS side, so the
+    same instance can be used as ON_PREM_URL and SAAS_URL, or two instances can be
+    started on different ports.
+    """
+
+    def __init__(self, dataset = None, host = "127.0.0.1", port = 0, latency = 0, jitter = 0, rate_limit = None, rate_limit_window = 1, concurrent_limit = None, error_rate = 0, error_statuses = None, error_match = None, ingest_delay = 0, seed = 0):
+        self.dataset = dataset or Dataset()
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limiter = RateLimiter(rate_limit, rate_limit_window, concurrent_limit)
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses or [500]
+        self.error_match = re.compile(error_match) if error_match else None
+        self.ingest_delay = ingest_delay
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.stats = Stats()
+        self.server = ThreadingHTTPServer((host, port), FakeSentryHandler)
+        self.server.daemon_threads = True
+        self.server.fake = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def get_api_url(self):
+        return f'{self.url}/api/0/'
+
+    def get_dsn(self, project_slug = None):
+        project = self.dataset.get_project(project_slug) if project_slug else self.dataset.projects[0]
+        host, port = self.server.server_address[:2]
+        return f'http://{project["keys"][0]["public"]}@{host}:{port}/{project["id"]}'
+
+    def start(self):
+        self.thread = threading.Thread(target = self.server.serve_forever, daemon = True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_delay(self):
+        with self.random_lock:
+            return self.latency + (self.random.uniform(0, self.jitter) if self.jitter > 0 else 0)
+
+    def get_injected_error(self, path):
+        if self.error_rate <= 0 or (self.error_match is not None and self.error_match.search(path) is None):
+            return None
+        with self.random_lock:
+            if self.random.random() < self.error_rate:
+                return self.random.choice(self.error_statuses)
+        return None
+
+class FakeSentryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PUT(self):
+        self.dispatch("PUT")
+
+    def do_PATCH(self):
+        self.dispatch("PATCH")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    @property
+    def fake(self):
+        return self.server.fake
+
+    @property
+    def dataset(self):
+        return self.server.fake.dataset
+
+    def dispatch(self, method):
+        start_time = time.monotonic()
+        parsed_url = urlparse(self.path)
+        self.route_path = parsed_url.path
+        self.params = parse_qs(parsed_url.query, keep_blank_values = True)
+        self.body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.response_headers = {}
+        route_name = "unknown"
+
+        if self.route_path.startswith("/_fake/"):
+            status, data = self.handle_control(method)
+            self.respond(status, data)
+            return
+
+        group = get_endpoint_group(self.route_path)
+        allowed, headers = self.fake.rate_limiter.acquire(group)
+        self.response_headers.update(headers)
+        try:
+            delay = self.fake.get_delay()
+            if delay > 0:
+                time.sleep(delay)
+
+            if not allowed:
+                status, data = 429, { "detail" : "You are attempting to use this endpoint too frequently. Limit is exceeded." }
+            else:
+                route_name, handler, kwargs = self.find_route(method)
+                injected_status = self.fake.get_injected_error(self.route_path)
+                if handler is None:
+                    status, data = 404, { "detail" : "The requested resource does not exist" }
+                elif injected_status is not None:
+                    status, data = injected_status, { "detail" : "Injected failure" }
+                elif self.route_path.startswith("/api/0/") and self.headers.get("Authorization") is None:
+                    status, data = 401, { "detail" : "Authentication credentials were not provided." }
+                else:
+                    try:
+                        status, data = handler(**kwargs)
+                    except HttpError as e:
+                        status, data = e.status, { "detail" : e.detail }
+                    except Exception as e:
+                        status, data = 500, { "detail" : f'Fake server error: {str(e)}' }
+        finally:
+            if allowed:
+                self.fake.rate_limiter.release(group)
+
+        bytes_out = self.respond(status, data)
+        self.fake.stats.record(route_name, status, len(self.body), bytes_out, time.monotonic() - start_time)
+
+    def find_route(self, method):
+        for route_method, pattern, name in API_ROUTES + INGEST_ROUTES:
+            if route_method != method:
+                continue
+            match = pattern.match(self.route_path)
+            if match is not None:
+                return name, getattr(self, name), match.groupdict()
+        return "unknown", None, {}
+
+    def respond(self, status, data):
+        body = b"" if data is None else json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in self.response_headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        return len(body)
+
+    def handle_control(self, method):
+        if method == "GET" and self.route_path == "/_fake/stats":
+            return 200, {
+                "routes" : self.fake.stats.snapshot(),
+                "ingested_events" : len(self.dataset.events),
+                "ingested_groups" : len(self.dataset.groups)
+            }
+        if method == "POST" and self.route_path == "/_fake/reset":
+            self.fake.stats.reset()
+            self.dataset.reset_ingested()
+            return 200, { "reset" : True }
+        return 404, { "detail" : "Unknown control endpoint" }
+
+    # Helpers
+
+    def get_param(self, name, default = None):
+        values = self.params.get(name)
+        return values[0] if values else default
+
+    def get_json(self):
+        if len(self.body) == 0:
+            return {}
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            raise HttpError(400, "Invalid JSON body")
+
+    def check_org(self, org):
+        if org != self.dataset.org:
+            raise HttpError(404, "The requested resource does not exist")
+
+    def require_project(self, org, project):
+        self.check_org(org)
+        found = self.dataset.get_project(project)
+        if found is None:
+            raise HttpError(404, "The requested resource does not exist")
+        return found
+
+    def get_page_size(self, default, maximum = 100):
+        value = self.get_param("per_page") or self.get_param("limit")
+        try:
+            return max(1, min(int(value), maximum)) if value else default
+        except ValueError:
+            raise HttpError(400, f'Invalid page size {value}')
+
+    def paginate(self, total, fetch, default_page_size = 100, maximum = 100):
+        """
+        Returns the page selected by the `cursor` param, `fetch(first, last)` returning the
+        items between two offsets, and sets the Link header like sentry.io does
+        """
+        page_size = self.get_page_size(default_page_size, maximum)
+        cursor = self.get_param("cursor")
+        offset = 0
+        if cursor:
+            try:
+                offset = int(cursor.split(":")[1])
+            except (IndexError, ValueError):
+                raise HttpError(400, f'Invalid cursor parameter {cursor}')
+
+        items = fetch(offset, min(offset + page_size, total))
+        self.set_link_header(offset, page_size, total)
+        self.response_headers["X-Hits"] = str(total)
+        self.response_headers["X-Max-Hits"] = str(total)
+        return items
+
+    def set_link_header(self, offset, page_size, total):
+        params = { key : values for key, values in self.params.items() if key != "cursor" }
+        base_url = f'http://{self.headers.get("Host")}{self.route_path}'
+
+        def link(rel, cursor, results):
+            query = urlencode(dict(params, cursor = cursor), doseq = True)
+            return f'<{base_url}?{query}>; rel="{rel}"; results="{"true" if results else "false"}"; cursor="{cursor}"'
+
+        previous_cursor = f'0:{max(offset - page_size, 0)}:1'
+        next_cursor = f'0:{offset + page_size}:0'
+        self.response_headers["Link"] = f'{link("previous", previous_cursor, offset > 0)}, {link("next", next_cursor, offset + page_size < total)}'
+
+    def paginate_list(self, items, default_page_size = 100, maximum = 100):
+        return self.paginate(len(items), lambda first, last: items[first:last], default_page_size, maximum)
+
+    # Projects
+
+    def list_projects(self):
+        return 200, self.paginate_list([self.dataset.serialize_project(project) for project in self.dataset.projects])
+
+    def list_org_projects(self, org):
+        self.check_org(org)
+        return self.list_projects()
+
+    def get_project(self, org, project):
+        return 200, self.dataset.serialize_project(self.require_project(org, project))
+
+    def update_project(self, org, project):
+        found = self.require_project(org, project)
+        payload = self.get_json()
+        with self.dataset.lock:
+            for key in ["name", "slug", "platform", "subjectPrefix"]:
+                if key in payload:
+                    found[key] = payload[key]
+        return 200, self.dataset.serialize_project(found)
+
+    def add_project_team(self, org, project, team):
+        found = self.require_project(org, project)
+        found_team = self.dataset.get_team(team)
+        if found_team is None:
+            raise HttpError(404, "The requested resource does not exist")
+        with self.dataset.lock:
+            if found_team["slug"] not in found["teams"]:
+                found["teams"].append(found_team["slug"])
+        return 201, self.dataset.serialize_project(found)
+
+    def list_keys(self, org, project):
+        # DSNs point back at this server, so events sent with them are ingested here
+        keys = json.loads(json.dumps(self.require_project(org, project)["keys"]).replace("https://", "http://").replace("fake.ingest.sentry.io", self.headers.get("Host")))
+        return 200, self.paginate_list(keys)
+
+    def update_key(self, org, project, key_id):
+        found = self.require_project(org, project)
+        payload = self.get_json()
+        for key in found["keys"]:
+            if key["id"] == key_id:
+                with self.dataset.lock:
+                    for field in ["name", "isActive", "rateLimit"]:
+                        if field in payload:
+                            key[field] = payload[field]
+                return 200, key
+        raise HttpError(404, "The requested resource does not exist")
+
+    def list_filters(self, org, project):
+        found = self.require_project(org, project)
+        filters = [{ "id" : filter_id, "active" : active } for filter_id, active in found["filters"].items()]
+        return 200, self.paginate_list(filters)
+
+    def update_filter(self, org, project, filter_id):
+        found = self.require_project(org, project)
+        if filter_id not in found["filters"]:
+            raise HttpError(404, "The requested resource does not exist")
+        payload = self.get_json()
+        with self.dataset.lock:
+            found["filters"][filter_id] = payload.get("active", found["filters"][filter_id])
+        return 204, None
+
+    def list_environments(self, org, project):
+        found = self.require_project(org, project)
+        return 200, [{ "id" : str(index + 1), "name" : name, "isHidden" : False } for index, name in enumerate(found["environments"])]
+
+    # On-prem issues
+
+    def list_issues(self, org, project):
+        found = self.require_project(org, project)
+        ids = None
+        since = None
+        until = None
+        for key, operator, values in parse_search(self.get_param("query", "is:unresolved")):
+            if key == "is" and values == ["unresolved"]:
+                continue
+            elif key == "issue.id":
+                ids = values
+            elif key == "lastSeen":
+                try:
+                    value = parse_date(values[0])
+                except ValueError:
+                    raise HttpError(400, f'Invalid date {values[0]}')
+                if operator in [">=", ">"]:
+                    since = value
+                elif operator in ["<", "<="]:
+                    until = value
+                else:
+                    raise HttpError(400, f'Unsupported lastSeen operator {operator}')
+            else:
+                raise HttpError(400, f'Unsupported search term {key}')
+
+        if ids is not None:
+            indexes = sorted(index for index in (self.dataset.get_issue_index(id) for id in ids) if index is not None)
+            first, last = self.dataset.get_index_range(since, until)
+            indexes = [index for index in indexes if first <= index < last]
+            return 200, self.paginate(len(indexes), lambda start, end: [self.dataset.build_issue(index, found) for index in indexes[start:end]], 25)
+
+        first, last = self.dataset.get_index_range(since, until)
+        return 200, self.paginate(last - first, lambda start, end: [self.dataset.build_issue(first + index, found) for index in range(start, end)], 25)
+
+    def get_seeded_index(self, issue_id):
+        index = self.dataset.get_issue_index(issue_id)
+        if index is None:
+            raise HttpError(404, "The requested resource does not exist")
+        return index
+
+    def get_issue(self, issue_id):
+        group = self.dataset.groups.get(issue_id)
+        if group is not None:
+            return 200, group
+        return 200, self.dataset.build_issue_details(self.get_seeded_index(issue_id))
+
+    def update_issue(self, issue_id):
+        payload = self.get_json()
+        with self.dataset.lock:
+            group = self.dataset.groups.get(issue_id)
+            if group is not None:
+                group.update(payload)
+                return 200, dict(group)
+
+        self.get_seeded_index(issue_id)
+        with self.dataset.lock:
+            self.dataset.issue_updates.setdefault(issue_id, {}).update(payload)
+        return 200, dict(payload, id = issue_id)
+
+    def get_latest_event(self, issue_id):
+        return 200, self.dataset.build_latest_event(self.get_seeded_index(issue_id))
+
+    def get_releases(self, issue_id):
+        return 200, self.dataset.build_releases(self.get_seeded_index(issue_id))
+
+    def list_issue_integrations(self, issue_id):
+        if issue_id in self.dataset.groups:
+            return 200, [self.dataset.build_integration([])]
+        return 200, self.dataset.build_integrations(self.get_seeded_index(issue_id))
+
+    def link_external_issue(self, issue_id, integration_id):
+        if issue_id not in self.dataset.groups and self.dataset.get_issue_index(issue_id) is None:
+            raise HttpError(404, "The requested resource does not exist")
+        payload = self.get_json()
+        if not payload.get("externalIssue"):
+            raise HttpError(400, "externalIssue is required")
+        return 201, { "id" : self.dataset.get_id(), "key" : payload["externalIssue"], "integrationId" : integration_id }
+
+    def list_integrations(self, org):
+        self.check_org(org)
+        return 200, [self.dataset.build_integration()]
+
+    # Stored events
+
+    def get_ingest_project(self, project_id):
+        project = self.dataset.get_project_by_id(project_id)
+        if project is None:
+            raise HttpError(404, "Unknown project")
+        sentry_key = self.get_param("sentry_key")
+        if sentry_key is None:
+            auth = self.headers.get("X-Sentry-Auth") or ""
+            match = re.search(r"sentry_key=([0-9a-f]+)", auth)
+            sentry_key = match.group(1) if match else None
+        if sentry_key != project["keys"][0]["public"]:
+            raise HttpError(401, "Invalid sentry_key")
+        return project
+
+    def get_decoded_body(self):
+        encoding = (self.headers.get("Content-Encoding") or "").lower()
+        try:
+            if encoding == "gzip":
+                return gzip.decompress(self.body)
+            if encoding == "deflate":
+                return zlib.decompress(self.body)
+            if encoding == "br":
+                try:
+                    import brotli
+                except ImportError:
+                    raise HttpError(415, "brotli is not installed on the fake server")
+                return brotli.decompress(self.body)
+        except (OSError, zlib.error):
+            raise HttpError(400, f'Could not decode {encoding} body')
+        return self.body
+
+    def store(self, project_id):
+        project = self.get_ingest_project(project_id)
+        try:
+            event = json.loads(self.get_decoded_body())
+        except ValueError:
+            raise HttpError(400, "Invalid event payload")
+        return 200, { "id" : self.dataset.ingest_event(project, event) }
+
+    def envelope(self, project_id):
+        project = self.get_ingest_project(project_id)
+        body = self.get_decoded_body()
+        header_line, _, rest = body.partition(b"\n")
+        try:
+            header = json.loads(header_line)
+        except ValueError:
+            raise HttpError(400, "Invalid envelope header")
+
+        event_id = header.get("event_id")
+        while len(rest) > 0:
+            item_line, _, rest = rest.partition(b"\n")
+            if item_line.strip() == b"":
+                continue
+            item_header = json.loads(item_line)
+            if "length" in item_header:
+                payload = rest[:item_header["length"]]
+                rest = rest[item_header["length"] + 1:]
+            else:
+                payload, _, rest = rest.partition(b"\n")
+
+            if item_header.get("type") == "event":
+                try:
+                    event = json.loads(payload)
+                except ValueError:
+                    raise HttpError(400, "Invalid event item")
+                event.setdefault("event_id", event_id)
+                event_id = self.dataset.ingest_event(project, event)
+
+        return 200, { "id" : event_id }
+
+    def get_event_value(self, event, field):
+        if field == "id":
+            return event["eventID"]
+        if field == "issue.id":
+            return int(event["groupID"])
+        if field == "project":
+            return event["project"]
+        if field == "timestamp":
+            return event["dateCreated"]
+        return event["tags"].get(field)
+
+    def filter_events(self, events, query):
+        for key, operator, values in parse_search(query):
+            if key == "project":
+                events = [event for event in events if event["project"] in values]
+            elif key == "id":
+                wanted = set(value.replace("-", "") for value in values)
+                events = [event for event in events if event["eventID"] in wanted]
+            elif key == "issue.id":
+                events = [event for event in events if event["groupID"] in values]
+            else:
+                events = [event for event in events if event["tags"].get(key) in values]
+        return events
+
+    def discover(self, org):
+        self.check_org(org)
+        fields = self.params.get("field") or ["id"]
+        events = self.filter_events(self.dataset.get_visible_events(self.fake.ingest_delay), self.get_param("query", ""))
+
+        aggregates = [field for field in fields if "(" in field]
+        if len(aggregates) > 0:
+            keys = [field for field in fields if "(" not in field]
+            rows = {}
+            for event in events:
+                values = tuple(self.get_event_value(event, key) for key in keys)
+                row = rows.get(values)
+                if row is None:
+                    row = rows.setdefault(values, dict(zip(keys, values), **{ aggregate : 0 for aggregate in aggregates }))
+                for aggregate in aggregates:
+                    row[aggregate] += 1
+            rows = list(rows.values())
+        else:
+            rows = [{ field : self.get_event_value(event, field) for field in fields } for event in events]
+
+        return 200, {
+            "data" : self.paginate_list(rows, 50),
+            "meta" : { "fields" : { field : "integer" if "(" in field or field == "issue.id" else "string" for field in fields } }
+        }
+
+    def list_project_events(self, org, project):
+        self.require_project(org, project)
+        events = [event for event in self.dataset.get_visible_events(self.fake.ingest_delay) if event["project"] == project]
+        return 200, self.paginate_list([self.serialize_event(event) for event in events])
+
+    def serialize_event(self, event):
+        return {
+            "id" : event["eventID"],
+            "eventID" : event["eventID"],
+            "groupID" : event["groupID"],
+            "projectID" : event["projectID"],
+            "dateCreated" : event["dateCreated"],
+            "dateReceived" : event["dateReceived"],
+            "tags" : [{ "key" : key, "value" : value } for key, value in event["tags"].items()]
+        }
+
+    def get_project_event(self, org, project, event_id):
+        self.require_project(org, project)
+        for event in self.dataset.get_visible_events(self.fake.ingest_delay):
+            if event["eventID"] == event_id.replace("-", "") and event["project"] == project:
+                return 200, self.serialize_event(event)
+        raise HttpError(404, "Event not found")
+
+    def get_tag_key(self, org, project, key):
+        self.require_project(org, project)
+        values = set()
+        for event in self.dataset.get_visible_events(self.fake.ingest_delay):
+            value = event["tags"].get(key)
+            if event["project"] == project and value is not None:
+                values.add(value)
+        if len(values) == 0:
+            raise HttpError(404, "Tag not found")
+        return 200, { "key" : key, "name" : key, "uniqueValues" : len(values) }
+
+    def list_tag_values(self, org, project, key):
+        self.require_project(org, project)
+        values = {}
+        for event in self.dataset.get_visible_events(self.fake.ingest_delay):
+            value = event["tags"].get(key)
+            if event["project"] != project or value is None:
+                continue
+            found = values.get(value)
+            if found is None:
+                found = values.setdefault(value, { "key" : key, "value" : value, "name" : value, "count" : 0, "firstSeen" : event["dateCreated"], "lastSeen" : event["dateCreated"] })
+            found["count"] += 1
+            found["firstSeen"] = min(found["firstSeen"], event["dateCreated"])
+            found["lastSeen"] = max(found["lastSeen"], event["dateCreated"])
+
+        ordered = sorted(values.values(), key = lambda value: value["lastSeen"], reverse = self.get_param("sort", "-last_seen").startswith("-"))
+        return 200, self.paginate_list(ordered)
+
+    # Alert rules
+
+    def list_combined_rules(self, org, project):
+        self.require_project(org, project)
+        with self.dataset.lock:
+            rules = [dict(rule) for rule in self.dataset.rules.values() if rule["project"] == project]
+            rules += [dict(rule) for rule in self.dataset.alert_rules.values() if rule["project"] == project]
+        return 200, self.paginate_list(rules, 25)
+
+    def create_rule_in(self, rules, org, project):
+        self.require_project(org, project)
+        payload = self.get_json()
+        if not payload.get("name"):
+            raise HttpError(400, "name is required")
+        rule = dict(payload, id = self.dataset.get_id(), project = project)
+        with self.dataset.lock:
+            rules[rule["id"]] = rule
+        return 201, rule
+
+    def update_rule_in(self, rules, org, project, rule_id):
+        self.require_project(org, project)
+        payload = self.get_json()
+        with self.dataset.lock:
+            rule = rules.get(rule_id)
+            if rule is None or rule["project"] != project:
+                raise HttpError(404, "The requested resource does not exist")
+            rule.update(payload)
+            rule["id"] = rule_id
+            return 200, dict(rule)
+
+    def delete_rule_in(self, rules, org, project, rule_id):
+        self.require_project(org, project)
+        with self.dataset.lock:
+            rule = rules.get(rule_id)
+            if rule is None or rule["project"] != project:
+                raise HttpError(404, "The requested resource does not exist")
+            del rules[rule_id]
+        return 202, None
+
+    def create_rule(self, org, project):
+        return self.create_rule_in(self.dataset.rules, org, project)
+
+    def update_rule(self, org, project, rule_id):
+        return self.update_rule_in(self.dataset.rules, org, project, rule_id)
+
+    def delete_rule(self, org, project, rule_id):
+        return self.delete_rule_in(self.dataset.rules, org, project, rule_id)
+
+    def create_alert_rule(self, org, project):
+        return self.create_rule_in(self.dataset.alert_rules, org, project)
+
+    def update_alert_rule(self, org, project, rule_id):
+        return self.update_rule_in(self.dataset.alert_rules, org, project, rule_id)
+
+    def delete_alert_rule(self, org, project, rule_id):
+        return self.delete_rule_in(self.dataset.alert_rules, org, project, rule_id)
+
+    # Teams and members
+
+    def list_teams(self, org):
+        self.check_org(org)
+        return 200, self.paginate_list(self.dataset.teams)
+
+    def create_team(self, org):
+        self.check_org(org)
+        payload = self.get_json()
+        slug = payload.get("slug") or (payload.get("name") or "").lower().replace(" ", "-")
+        if slug == "":
+            raise HttpError(400, "name or slug is required")
+        with self.dataset.lock:
+            if any(team["slug"] == slug for team in self.dataset.teams):
+                raise HttpError(409, "A team with this slug already exists.")
+            team = { "id" : str(len(self.dataset.teams) + 1), "slug" : slug, "name" : payload.get("name") or slug, "memberCount" : 0 }
+            self.dataset.teams.append(team)
+        return 201, team
+
+    def list_team_members(self, org, team):
+        self.check_org(org)
+        if self.dataset.get_team(team) is None:
+            raise HttpError(404, "The requested resource does not exist")
+        return 200, self.paginate_list([member for member in self.dataset.members if team in member["teams"]])
+
+    def list_members(self, org):
+        self.check_org(org)
+        return 200, self.paginate_list(self.dataset.members)
+
+    def add_member_team(self, org, member_id, team):
+        self.check_org(org)
+        member = self.dataset.get_member(member_id)
+        found_team = self.dataset.get_team(team)
+        if member is None or found_team is None:
+            raise HttpError(404, "The requested resource does not exist")
+        with self.dataset.lock:
+            if team in member["teams"]:
+                return 204, None
+            member["teams"].append(team)
+        return 201, found_team
+
+    # SCIM
+
+    def scim_list(self, resources):
+        start_index = int(self.get_param("startIndex", "1"))
+        count = min(int(self.get_param("count", "100")), 100)
+        page = resources[start_index - 1:start_index - 1 + count]
+        return {
+            "schemas" : [SCIM_LIST_SCHEMA],
+            "totalResults" : len(resources),
+            "startIndex" : start_index,
+            "itemsPerPage" : len(page),
+            "Resources" : page
+        }
+
+    def serialize_scim_user(self, member):
+        return {
+            "schemas" : [SCIM_USER_SCHEMA],
+            "id" : member["id"],
+            "userName" : member["email"],
+            "name" : { "givenName" : "N/A", "familyName" : "N/A" },
+            "emails" : [{ "primary" : True, "value" : member["email"], "type" : "work" }],
+            "active" : True,
+            "meta" : { "resourceType" : "User" }
+        }
+
+    def serialize_scim_group(self, team):
+        members = [member for member in self.dataset.members if team["slug"] in member["teams"]]
+        return {
+            "schemas" : [SCIM_GROUP_SCHEMA],
+            "id" : team["id"],
+            "displayName" : team["slug"],
+            "members" : [{ "value" : member["id"], "display" : member["email"] } for member in members],
+            "meta" : { "resourceType" : "Group" }
+        }
+
+    def list_scim_users(self, org):
+        self.check_org(org)
+        members = self.dataset.members
+        match = re.match(r'userName eq "(.*)"', self.get_param("filter", ""))
+        if match is not None:
+            members = [member for member in members if member["email"] == match.group(1)]
+        return 200, self.scim_list([self.serialize_scim_user(member) for member in members])
+
+    def create_scim_user(self, org):
+        self.check_org(org)
+        payload = self.get_json()
+        email = payload.get("userName")
+        if not email:
+            raise HttpError(400, "userName is required")
+        with self.dataset.lock:
+            if any(member["email"] == email for member in self.dataset.members):
+                raise HttpError(409, "User already exists in the database.")
+            index = len(self.dataset.members)
+            member = {
+                "id" : str(index + 1),
+                "email" : email,
+                "name" : email,
+                "role" : "member",
+                "user" : { "id" : str(index + 1), "email" : email, "username" : email },
+                "teams" : []
+            }
+            self.dataset.members.append(member)
+        return 201, self.serialize_scim_user(member)
+
+    def get_scim_team(self, team_id):
+        for team in self.dataset.teams:
+            if team["id"] == team_id:
+                return team
+        raise HttpError(404, "Group not found")
+
+    def list_scim_groups(self, org):
+        self.check_org(org)
+        return 200, self.scim_list([self.serialize_scim_group(team) for team in self.dataset.teams])
+
+    def get_scim_group(self, org, team_id):
+        self.check_org(org)
+        return 200, self.serialize_scim_group(self.get_scim_team(team_id))
+
+    def update_scim_group(self, org, team_id):
+        self.check_org(org)
+        team = self.get_scim_team(team_id)
+        payload = self.get_json()
+        for operation in payload.get("Operations", []):
+            if operation.get("op", "").lower() == "replace" and operation.get("path") == "members":
+                member_ids = set(str(member.get("value")) for member in operation.get("value") or [])
+                with self.dataset.lock:
+                    for member in self.dataset.members:
+                        if member["id"] in member_ids and team["slug"] not in member["teams"]:
+                            member["teams"].append(team["slug"])
+                        elif member["id"] not in member_ids and team["slug"] in member["teams"]:
+                            member["teams"].remove(team["slug"])
+        return 204, None
+
+def main():
+    options = {
+        "port" : 9000,
+        "issues" : 1000,
+        "frames" : 20,
+        "days" : 30,
+        "org" : "fake-org",
+        "projects" : "fake-project",
+        "teams" : 20,
+        "members" : 200,
+        "latency-ms" : 0,
+        "jitter-ms" : 0,
+        "rate-limit" : None,
+        "rate-limit-window" : 1,
+        "concurrent-limit" : None,
+        "error-rate" : 0,
+        "error-status" : "500",
+        "error-match" : None,
+        "ingest-delay-ms" : 0,
+        "seed" : 0
+    }
+    for arg in sys.argv[1:]:
+        name, _, value = arg[2:].partition("=")
+        if name not in options:
+            print(f'Unknown argument {arg}')
+            sys.exit(1)
+        options[name] = value
+
+    dataset = Dataset(
+        issue_count = int(options["issues"]),
+        frame_count = int(options["frames"]),
+        days = int(options["days"]),
+        org = options["org"],
+        projects = options["projects"].split(","),
+        team_count = int(options["teams"]),
+        member_count = int(options["members"]),
+        seed = int(options["seed"])
+    )
+    fake = FakeSentry(
+        dataset,
+        port = int(options["port"]),
+        latency = float(options["latency-ms"]) / 1000,
+        jitter = float(options["jitter-ms"]) / 1000,
+        rate_limit = int(options["rate-limit"]) if options["rate-limit"] else None,
+        rate_limit_window = float(options["rate-limit-window"]),
+        concurrent_limit = int(options["concurrent-limit"]) if options["concurrent-limit"] else None,
+        error_rate = float(options["error-rate"]),
+        error_statuses = [int(status) for status in options["error-status"].split(",")],
+        error_match = options["error-match"],
+        ingest_delay = float(options["ingest-delay-ms"]) / 1000,
+        seed = int(options["seed"])
+    )
+
+    print(f'Fake Sentry listening on {fake.url} ({dataset.issue_count} issues in {dataset.org}/{dataset.projects[0]["slug"]})')
+    print(f'ON_PREM_URL={fake.get_api_url()}')
+    print(f'SAAS_URL={fake.get_api_url()}')
+    print(f'SAAS_PROJECT_DSN={fake.get_dsn()}')
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        fake.server.server_close()
+
+if __name__ == "__main__":
+    main()
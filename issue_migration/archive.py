@@ -0,0 +1,105 @@
+from datetime import datetime, timezone
+from metrics import write_atomic
+import sink
+import json
+import os
+
+INDEX_FILE_NAME = "index.json"
+CHUNK_FILE_NAME = "issues.jsonl"
+DEFAULT_ARCHIVE_PATH = "./issue_archive"
+DEFAULT_COMPRESSION = "gzip"
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+DEFAULT_INDEX_INTERVAL = 100
+VERSION = 1
+
+class ArchiveWriter:
+    """
+    Writes the on-prem data of each issue (The issue, its release, latest event and
+    integrations) to a directory of compressed JSONL chunks, through a rotating
+    sink.JsonlWriter. index.json lists the chunks and is rewritten every time a
+    chunk is completed and every `index_interval` records, so an interrupted export
+    can still be imported
+    """
+
+    def __init__(self, path, source, compression = DEFAULT_COMPRESSION, max_bytes = DEFAULT_CHUNK_BYTES, index_interval = DEFAULT_INDEX_INTERVAL):
+        if os.path.exists(os.path.join(path, INDEX_FILE_NAME)):
+            raise Exception(f'Archive {path} already exists - Export to a new directory')
+
+        self.path = path
+        self.index_interval = index_interval
+        self.index = {
+            "version" : VERSION,
+            "created" : datetime.now(timezone.utc).isoformat(),
+            "source" : source,
+            "compression" : compression,
+            "complete" : False,
+            "issues" : 0,
+            "failed_issues" : [],
+            "chunks" : []
+        }
+        self.writer = sink.JsonlWriter(os.path.join(path, CHUNK_FILE_NAME), compression, max_bytes)
+        self.write_index()
+
+    def write(self, record):
+        self.writer.write(record)
+        file_name = os.path.basename(self.writer.file_name)
+        chunks = self.index["chunks"]
+        if len(chunks) == 0 or chunks[-1]["file"] != file_name:
+            if len(chunks) > 0:
+                self.write_index()
+            chunks.append({
+                "file" : file_name,
+                "issues" : 0,
+                "first_issue_id" : record["issue"]["id"]
+            })
+
+        chunks[-1]["issues"] += 1
+        chunks[-1]["last_issue_id"] = record["issue"]["id"]
+        self.index["issues"] += 1
+        if self.index["issues"] % self.index_interval == 0:
+            self.write_index()
+
+    def add_failed_issue(self, issue_id):
+        self.index["failed_issues"].append(issue_id)
+
+    def write_index(self):
+        write_atomic(os.path.join(self.path, INDEX_FILE_NAME), json.dumps(self.index, indent = 2))
+
+    def close(self, complete = True):
+        self.writer.close()
+        self.index["complete"] = complete
+        self.write_index()
+
+class ArchiveReader:
+    """
+    Reads an archive written by ArchiveWriter, chunk by chunk. The index of an
+    interrupted export may be behind its chunks, so those are read from the chunk
+    files found in the directory, up to the last complete record
+    """
+
+    def __init__(self, path):
+        index_path = os.path.join(path, INDEX_FILE_NAME)
+        if not os.path.isfile(index_path):
+            raise Exception(f'{path} is not an issue archive - {INDEX_FILE_NAME} not found')
+
+        with open(index_path) as file:
+            self.index = json.load(file)
+        if self.index.get("version") != VERSION:
+            raise Exception(f'Unsupported archive version {self.index.get("version")}')
+        self.path = path
+
+    def read(self):
+        complete = self.index["complete"]
+        for file_name in self.get_chunk_files():
+            yield from sink.read_records(os.path.join(self.path, file_name), truncated = not complete)
+
+    def get_chunk_files(self):
+        if self.index["complete"]:
+            return [chunk["file"] for chunk in self.index["chunks"]]
+
+        files = []
+        while True:
+            file_name = sink.get_file_name(CHUNK_FILE_NAME, len(files), self.index["compression"])
+            if not os.path.isfile(os.path.join(self.path, file_name)):
+                return files
+            files.append(file_name)
@@ -0,0 +1,199 @@
+"""
+End-to-end benchmark: runs Main.init against the fake Sentry server (fake_sentry/
+at the root of the repo) for every dataset size and injected latency, and writes
+issues/sec, requests per issue, per-endpoint latency percentiles, bytes sent and
+received and peak RSS as JSON.
+
+Each run migrates in a child process, so RSS and CPU are not shared with the
+server, which runs in this process.
+
+Usage: python bench/e2e.py [--sizes=1000,10000,100000] [--latencies-ms=0,20,100]
+       [--concurrency=16] [--frames=20] [--output=bench_e2e.json] [--main-args="--transport=store"]
+"""
+from datetime import date, timedelta
+import subprocess
+import shutil
+import tempfile
+import resource
+import shlex
+import json
+import time
+import os, sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATION_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.dirname(MIGRATION_DIR))
+sys.path.insert(0, MIGRATION_DIR)
+
+def get_percentile(values, percentile):
+    if len(values) == 0:
+        return None
+    return values[min(int(len(values) * percentile / 100), len(values) - 1)]
+
+def get_peak_rss():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def run_worker(config_path):
+    """
+    Child process: migrates every issue of the fake server and writes its own measurements
+    """
+    with open(config_path) as file:
+        config = json.load(file)
+
+    import requests
+    from scheduler import get_endpoint_group
+    import main
+
+    latencies = {}
+    send = requests.Session.request
+
+    def timed_request(session, method, url, *args, **kwargs):
+        start_time = time.perf_counter()
+        response = send(session, method, url, *args, **kwargs)
+        # /api/0/ and /api/<project id>/ both become /api/{id}/
+        endpoint = f'{method} {get_endpoint_group(url).split("/api/{id}/", 1)[-1]}'
+        latencies.setdefault(endpoint, []).append(time.perf_counter() - start_time)
+        return response
+
+    requests.Session.request = timed_request
+    os.environ.update(config["env"])
+    sys.argv = ["main.py"] + config["args"]
+
+    migration = main.Main()
+    start_time = time.perf_counter()
+    migration.init()
+    elapsed = time.perf_counter() - start_time
+
+    result = {
+        "seconds" : elapsed,
+        "issues" : getattr(migration, "issue_count", 0),
+        "peak_rss_bytes" : get_peak_rss(),
+        "endpoints" : {}
+    }
+    for endpoint, values in latencies.items():
+        values.sort()
+        result["endpoints"][endpoint] = {
+            "requests" : len(values),
+            "p50_ms" : get_percentile(values, 50) * 1000,
+            "p95_ms" : get_percentile(values, 95) * 1000,
+            "p99_ms" : get_percentile(values, 99) * 1000
+        }
+
+    with open(config["result_path"], "w") as file:
+        json.dump(result, file)
+
+def run_scenario(size, latency_ms, options):
+    from fake_sentry.server import FakeSentry
+    from fake_sentry.data import Dataset
+
+    fake = FakeSentry(Dataset(issue_count = size, frame_count = options["frames"], days = 30), latency = latency_ms / 1000)
+    fake.start()
+    work_dir = tempfile.mkdtemp(prefix = "bench-e2e-")
+    try:
+        config = {
+            "env" : {
+                "ON_PREM_URL" : fake.get_api_url(),
+                "ON_PREM_AUTH_TOKEN" : "bench",
+                "ON_PREM_ORG_NAME" : fake.dataset.org,
+                "ON_PREM_PROJECT_NAME" : fake.dataset.projects[0]["slug"],
+                "SAAS_URL" : fake.get_api_url(),
+                "SAAS_AUTH_TOKEN" : "bench",
+                "SAAS_ORG_NAME" : fake.dataset.org,
+                "SAAS_PROJECT_NAME" : fake.dataset.projects[0]["slug"],
+                "SAAS_PROJECT_DSN" : fake.get_dsn(),
+                "JOURNAL_PATH" : os.path.join(work_dir, "journal.db"),
+                "OUTPUT_PATH" : os.path.join(work_dir, "output.jsonl")
+            },
+            "args" : [
+                f'--start={(date.today() - timedelta(days = 30)).isoformat()}',
+                f'--end={date.today().isoformat()}',
+                f'--concurrency={options["concurrency"]}'
+            ] + options["main_args"],
+            "result_path" : os.path.join(work_dir, "result.json")
+        }
+        config_path = os.path.join(work_dir, "config.json")
+        with open(config_path, "w") as file:
+            json.dump(config, file)
+
+        # Logs go to the work dir, the logger writes to ./logger/logs/
+        with open(os.path.join(work_dir, "console.log"), "w") as console:
+            process = subprocess.run([sys.executable, os.path.abspath(__file__), f'--worker={config_path}'], cwd = work_dir, stdout = console, stderr = subprocess.STDOUT)
+        if process.returncode != 0:
+            raise Exception(f'Migration of {size} issues failed - See {work_dir}/console.log')
+
+        with open(config["result_path"]) as file:
+            result = json.load(file)
+        server_stats = fake.stats.snapshot()
+        shutil.rmtree(work_dir, ignore_errors = True)
+    finally:
+        fake.stop()
+
+    requests_count = sum(stats["requests"] for stats in server_stats.values())
+    issues = max(result["issues"], 1)
+    return {
+        "issues" : size,
+        "latency_ms" : latency_ms,
+        "concurrency" : options["concurrency"],
+        "migrated_issues" : result["issues"],
+        "ingested_events" : len(fake.dataset.events),
+        "seconds" : round(result["seconds"], 3),
+        "issues_per_sec" : round(result["issues"] / result["seconds"], 2),
+        "requests" : requests_count,
+        "requests_per_issue" : round(requests_count / issues, 2),
+        "bytes_sent" : sum(stats["bytes_in"] for stats in server_stats.values()),
+        "bytes_received" : sum(stats["bytes_out"] for stats in server_stats.values()),
+        "peak_rss_bytes" : result["peak_rss_bytes"],
+        # Latency as seen by the migration, and status codes and bytes as seen by the server
+        "endpoints" : { endpoint : { key : round(value, 3) if isinstance(value, float) else value for key, value in stats.items() } for endpoint, stats in sorted(result["endpoints"].items()) },
+        "server_routes" : server_stats
+    }
+
+def main():
+    options = {
+        "sizes" : [1000, 10000, 100000],
+        "latencies" : [0, 20, 100],
+        "concurrency" : 16,
+        "frames" : 20,
+        "output" : "bench_e2e.json",
+        "main_args" : []
+    }
+    for arg in sys.argv[1:]:
+        name, _, value = arg.partition("=")
+        if name == "--help":
+            print(__doc__)
+            return
+        elif name == "--worker":
+            run_worker(value)
+            return
+        elif name == "--sizes":
+            options["sizes"] = [int(size) for size in value.split(",")]
+        elif name == "--latencies-ms":
+            options["latencies"] = [float(latency) for latency in value.split(",")]
+        elif name == "--concurrency":
+            options["concurrency"] = int(value)
+        elif name == "--frames":
+            options["frames"] = int(value)
+        elif name == "--output":
+            options["output"] = value
+        elif name == "--main-args":
+            options["main_args"] = shlex.split(value)
+        else:
+            # A full run takes hours, so a mistyped argument should not start one
+            print(f'Invalid argument `{arg}`\n{__doc__}')
+            sys.exit(1)
+
+    results = []
+    for size in options["sizes"]:
+        for latency_ms in options["latencies"]:
+            report = run_scenario(size, latency_ms, options)
+            results.append(report)
+            print(f'{size:>7} issues  {latency_ms:>5g}ms  {report["issues_per_sec"]:>8.2f} issues/s  {report["requests_per_issue"]:>5.2f} requests/issue  peak RSS {report["peak_rss_bytes"] / 1024 / 1024:.1f}MB  sent {report["bytes_sent"]} bytes  received {report["bytes_received"]} bytes')
+
+    with open(options["output"], "w") as file:
+        json.dump({ "options" : options, "results" : results }, file, indent = 2)
+    print(f'Results written to {options["output"]}')
+
+if __name__ == "__main__":
+    main()
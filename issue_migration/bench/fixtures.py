@@ -0,0 +1,84 @@
+"""
+Synthetic on-prem issues and latest events shaped like the responses of the
+issues/<id>/ and issues/<id>/events/latest/ endpoints, for benchmarks.
+"""
+import random
+
+PLATFORMS = ["python", "javascript", "native"]
+
+def build_frame(platform, index, rng):
+    frame = {
+        "filename" : f'src/module_{index % 50}/file_{index}.py' if platform == "python" else f'app/static/bundle_{index % 20}.js',
+        "function" : f'function_{index}',
+        "lineNo" : rng.randint(1, 2000),
+        "colNo" : rng.randint(1, 120) if platform == "javascript" else None,
+        "inApp" : index % 3 != 0
+    }
+
+    if platform == "python":
+        frame["module"] = f'module_{index % 50}.file_{index}'
+        frame["filename"] = f'module_{index % 50}/file_{index}.py'
+        frame["vars"] = {
+            "self" : "<Handler object at 0x7f0000000000>",
+            "e" : f"KeyError('key_{index}')",
+            "items" : [f'item_{i}' for i in range(5)]
+        }
+        frame["context"] = [[line, f'    value_{line} = compute(items, "key_{index}")' if line != 5 else f'    raise KeyError("key_{index}")'] for line in range(1, 10)]
+    elif platform == "javascript":
+        frame["module"] = f'app/components/Component{index % 40}'
+        frame["context"] = [[line, f'  const value{line} = props.items[{line}];'] for line in range(1, 6)]
+    else:
+        frame["package"] = f'/usr/lib/libapp_{index % 10}.so'
+        frame["instructionAddr"] = hex(0x7f0000000000 + index * 16)
+        frame["symbolAddr"] = hex(0x7f0000000000 + index * 16 - 8)
+        frame["rawFunction"] = f'_ZN3app8function{index}Ev'
+        frame["symbol"] = f'_ZN3app8function{index}Ev'
+        frame["trust"] = "cfi" if index % 2 else "fp"
+        frame["errors"] = None
+
+    return frame
+
+def build_event(platform, frame_count, seed = 0):
+    rng = random.Random(seed)
+    frames = [build_frame(platform, index, rng) for index in range(frame_count)]
+    tags = [{"key" : f'tag_{i}', "value" : f'value_{i}'} for i in range(20)]
+    tags.append({"key" : "environment", "value" : "production"})
+    tags.append({"key" : "release", "value" : "app@1.0.0"})
+
+    return {
+        "eventID" : f'{seed:032x}',
+        "platform" : platform,
+        "dateCreated" : "2023-01-01T10:00:00.123Z",
+        "sdk" : {"name" : f'sentry.{platform}', "version" : "1.0.0"},
+        "tags" : tags,
+        "contexts" : {"os" : {"name" : "Linux"}, "runtime" : {"name" : platform}},
+        "message" : "",
+        "extra" : {f'extra_{i}' : "x" * 50 for i in range(10)},
+        "entries" : [
+            {
+                "type" : "exception",
+                "data" : {
+                    "values" : [{
+                        "type" : "KeyError",
+                        "value" : "'key'",
+                        "mechanism" : {"type" : "generic", "handled" : False},
+                        "stacktrace" : {"frames" : frames}
+                    }]
+                }
+            },
+            {
+                "type" : "breadcrumbs",
+                "data" : {"values" : [{"category" : "http", "message" : f'GET /api/{i}', "level" : "info"} for i in range(50)]}
+            }
+        ]
+    }
+
+def build_issue(id, level = "error"):
+    return {
+        "id" : str(id),
+        "level" : level,
+        "firstSeen" : "2023-01-01T10:00:00.123Z",
+        "lastSeen" : "2023-01-02T10:00:00.123Z",
+        "release" : {"first" : "app@1.0.0"},
+        "migration_id" : "00000000-0000-0000-0000-000000000000"
+    }
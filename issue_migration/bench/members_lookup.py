@@ -0,0 +1,62 @@
+"""
+Compares member/team lookups through the Members indexes against the linear
+scans they replaced, on a synthetic org.
+
+Usage: python bench/members_lookup.py [--members=100000] [--teams=5000] [--lookups=2000]
+"""
+import random
+import time
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from members import Members
+
+def build_fixture(member_count, team_count):
+    members = [{"email": f'user{i}@example.com', "user": {"id": str(i)}} for i in range(member_count)]
+    teams = [{"id": str(i), "slug": f'team-{i}', "name": f'Team {i}'} for i in range(team_count)]
+    return members, teams
+
+def scan_user_id(members, email):
+    for member in members:
+        if member["email"] == email:
+            return member["user"]["id"]
+    return None
+
+def scan_team_id(teams, name):
+    for team in teams:
+        if team["slug"].lower() == name.lower() or team["name"].lower() == name.lower():
+            return team["id"]
+    return None
+
+def run(label, func, keys):
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    elapsed = time.perf_counter() - start
+    print(f'{label:<16} {elapsed / len(keys) * 1000000:.2f}us/lookup')
+
+def main():
+    options = {"--members": 100000, "--teams": 5000, "--lookups": 2000}
+    for arg in sys.argv[1:]:
+        sp = arg.split("=")
+        if sp[0] in options:
+            options[sp[0]] = int(sp[1])
+
+    members, teams = build_fixture(options["--members"], options["--teams"])
+    emails = [f'user{random.randrange(options["--members"])}@example.com' for _ in range(options["--lookups"])]
+    team_names = [f'TEAM {random.randrange(options["--teams"])}' for _ in range(options["--lookups"])]
+
+    start = time.perf_counter()
+    member_obj = Members()
+    member_obj.populate_members(members)
+    member_obj.populate_teams(teams)
+    print(f'{"index build":<16} {(time.perf_counter() - start) * 1000:.2f}ms')
+
+    run("scan users", lambda email: scan_user_id(members, email), emails)
+    run("index users", member_obj.getUserID, emails)
+    run("scan teams", lambda name: scan_team_id(teams, name), team_names)
+    run("index teams", member_obj.getTeamID, team_names)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Benchmarks processor.normalize_issue on synthetic Python, JavaScript and native
+events with 10, 100 and 1000 frames.
+
+Usage: python bench/normalize.py [--rounds=20]
+"""
+import json
+import time
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from processor import normalize_issue
+from fixtures import PLATFORMS, build_event, build_issue
+
+FRAME_COUNTS = [10, 100, 1000]
+
+def run(platform, frame_count, rounds):
+    event = build_event(platform, frame_count)
+    issue = build_issue(1)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        payload = normalize_issue(event, issue)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    size = len(json.dumps(payload))
+    print(f'{platform:<11} {frame_count:>5} frames  p50={timings[len(timings) // 2] * 1000:.3f}ms  min={timings[0] * 1000:.3f}ms  payload={size} bytes')
+
+def main():
+    rounds = 20
+    for arg in sys.argv[1:]:
+        if arg.startswith("--rounds="):
+            rounds = int(arg.split("=")[1])
+
+    for platform in PLATFORMS:
+        for frame_count in FRAME_COUNTS:
+            run(platform, frame_count, rounds)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Compares normalizing 1000-frame events in the migration threads with normalizing them
+in a pool of worker processes (--normalizeWorkers). Both sides start from the raw event
+bytes and end with the serialized payload, as they would when storing the event.
+
+Usage: python bench/normalize_workers.py [--events=60] [--threads=8] [--workers=4]
+"""
+from concurrent.futures import ThreadPoolExecutor
+import json
+import time
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from normalizer import InlineNormalizer, ProcessNormalizer
+from fixtures import PLATFORMS, build_event, build_issue
+
+FRAME_COUNT = 1000
+
+def run_inline(events, issues, threads):
+    normalizer = InlineNormalizer()
+    def normalize(index):
+        normalized = normalizer.normalize(json.loads(events[index]), issues[index])
+        return json.dumps(normalized["payload"]).encode("utf-8")
+
+    with ThreadPoolExecutor(max_workers = threads) as executor:
+        start = time.perf_counter()
+        sizes = list(executor.map(normalize, range(len(events))))
+        return time.perf_counter() - start, sum(len(size) for size in sizes)
+
+def run_processes(events, issues, threads, workers):
+    normalizer = ProcessNormalizer(workers)
+    try:
+        # Start the worker processes before timing
+        normalizer.normalize(events[0], issues[0])
+        def normalize(index):
+            return normalizer.normalize(events[index], issues[index])["body"]
+
+        with ThreadPoolExecutor(max_workers = threads) as executor:
+            start = time.perf_counter()
+            bodies = list(executor.map(normalize, range(len(events))))
+            return time.perf_counter() - start, sum(len(body) for body in bodies)
+    finally:
+        normalizer.close()
+
+def main():
+    event_count = 60
+    threads = 8
+    workers = os.cpu_count() or 1
+    for arg in sys.argv[1:]:
+        if arg.startswith("--events="):
+            event_count = int(arg.split("=")[1])
+        elif arg.startswith("--threads="):
+            threads = int(arg.split("=")[1])
+        elif arg.startswith("--workers="):
+            workers = int(arg.split("=")[1])
+
+    events = []
+    issues = []
+    for index in range(event_count):
+        event = build_event(PLATFORMS[index % len(PLATFORMS)], FRAME_COUNT, seed = index)
+        events.append(json.dumps(event).encode("utf-8"))
+        issues.append(build_issue(index + 1))
+
+    print(f'{event_count} events with {FRAME_COUNT} frames, {threads} threads, {os.cpu_count()} CPUs')
+    elapsed, size = run_inline(events, issues, threads)
+    print(f'inline            {elapsed:.3f}s  {event_count / elapsed:.1f} events/s  {size} bytes')
+    elapsed, size = run_processes(events, issues, threads, workers)
+    print(f'{workers} worker processes {elapsed:.3f}s  {event_count / elapsed:.1f} events/s  {size} bytes')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares per-request latency of bare `requests.get` calls against the pooled
+`request.Client` using a local stand-in server.
+
+The server sleeps `--handshake-ms` once per new connection to stand in for the
+TCP+TLS setup cost paid against a remote on-prem or SaaS host.
+
+Usage: python bench/request_pool.py [--requests=500] [--handshake-ms=20]
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import threading
+import requests
+import time
+import json
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from request import Client
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    handshake = 0
+    body = json.dumps([{"id": "1", "lastSeen": "2023-01-01T00:00:00Z"}]).encode()
+
+    def setup(self):
+        time.sleep(self.handshake)
+        super().setup()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+def run(label, func, url, count):
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = func(url)
+        response.content
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f'{label:<12} mean={sum(timings) / count * 1000:.3f}ms p50={timings[count // 2] * 1000:.3f}ms p95={timings[int(count * 0.95)] * 1000:.3f}ms')
+
+def main():
+    count = 500
+    StandInHandler.handshake = 0.02
+    for arg in sys.argv[1:]:
+        if arg.startswith("--requests="):
+            count = int(arg.split("=")[1])
+        elif arg.startswith("--handshake-ms="):
+            StandInHandler.handshake = float(arg.split("=")[1]) / 1000
+
+    os.environ.setdefault("ON_PREM_AUTH_TOKEN", "bench")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/api/0/issues/1/'
+
+    client = Client()
+    run("bare", lambda url: requests.get(url, headers = {"Authorization": "Bearer bench"}), url, count)
+    run("pooled", lambda url: client.request(url, method = "GET"), url, count)
+
+    client.close()
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Builds the pipeline stages (Dedup, normalizer, output and archive) from the CLI
+arguments and env variables. Kept out of sentry.utils, which processor imports
+"""
+from dotenv import load_dotenv
+from sentry.utils import get_cli_arg
+import normalizer
+import archive
+import dedup
+import sink
+import os
+
+def get_dedup(cli_args, sentry, logger):
+    load_dotenv()
+    strategy = get_cli_arg(cli_args, "--dedup", os.environ.get("DEDUP", "discover")).lower()
+    if strategy == "tags":
+        return dedup.TagValueDedup(sentry, os.environ.get("DEDUP_CACHE_PATH", dedup.DEFAULT_CACHE_PATH), dry_run = "--dry-run" in cli_args)
+    if strategy != "discover":
+        logger.error(f'Invalid dedup strategy {strategy} - Strategy should be discover or tags')
+    return dedup.DiscoverDedup(sentry)
+
+def get_normalizer(cli_args, logger):
+    load_dotenv()
+    value = get_cli_arg(cli_args, "--normalizeWorkers", os.environ.get("NORMALIZE_WORKERS", "0"))
+    try:
+        workers = int(value)
+    except ValueError:
+        logger.error(f'Invalid normalize workers {value} - Normalize workers should be a number')
+        return normalizer.InlineNormalizer()
+
+    if workers < 1:
+        return normalizer.InlineNormalizer()
+    return normalizer.ProcessNormalizer(workers)
+
+def get_output_writer():
+    load_dotenv()
+    max_bytes = os.environ.get("OUTPUT_MAX_BYTES")
+    return sink.JsonlWriter(
+        os.environ.get("OUTPUT_PATH", "./output.jsonl"),
+        os.environ.get("OUTPUT_COMPRESSION") or None,
+        int(max_bytes) if max_bytes else None
+    )
+
+def get_archive_path(cli_args):
+    load_dotenv()
+    return get_cli_arg(cli_args, "--archive", os.environ.get("ARCHIVE_PATH", archive.DEFAULT_ARCHIVE_PATH))
+
+def get_archive_reader(cli_args):
+    return archive.ArchiveReader(get_archive_path(cli_args))
+
+def get_archive_writer(cli_args, source):
+    load_dotenv()
+    compression = os.environ.get("ARCHIVE_COMPRESSION", archive.DEFAULT_COMPRESSION).lower()
+    max_bytes = os.environ.get("ARCHIVE_CHUNK_BYTES")
+    return archive.ArchiveWriter(
+        get_archive_path(cli_args),
+        source,
+        None if compression == "none" else compression,
+        int(max_bytes) if max_bytes else archive.DEFAULT_CHUNK_BYTES
+    )
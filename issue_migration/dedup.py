@@ -0,0 +1,112 @@
+from pipeline import batched
+import threading
+import json
+import os
+
+DEFAULT_CACHE_PATH = "./onprem_ids_cache.json"
+
+class DiscoverDedup:
+    """
+    Finds the on-prem issues that already exist in SaaS with one discover query per
+    batch of on-prem IDs (onprem_id:[...]), and keeps the result in memory for the run
+    """
+
+    def __init__(self, sentry, batch_size = 200):
+        self.sentry = sentry
+        self.batch_size = batch_size
+        self.existing = {}
+
+    def prefetch(self, onprem_ids):
+        for batch in batched(onprem_ids, self.batch_size):
+            self.existing.update(self.sentry.get_existing_issue_ids(batch))
+
+    def get(self, onprem_id):
+        return self.existing.get(str(onprem_id))
+
+    def add(self, onprem_id):
+        pass
+
+    def save(self):
+        pass
+
+class TagValueDedup(DiscoverDedup):
+    """
+    Pages once through the values of the `onprem_id` tag in the SaaS project to build
+    the set of migrated on-prem IDs, and keeps it in a cache file so later runs only
+    fetch values seen since the last refresh. Discover is only queried for the
+    issues found in the set, to get their SaaS issue IDs.
+
+    A tag value's lastSeen is the event timestamp, which is the on-prem event date for
+    migrated events, so values stored after a refresh can be older than its cutoff.
+    Issues stored by this run are added to the set directly (See add) and the cache is
+    saved every `batch_size` of them. Values the cache missed anyway (A run killed
+    before saving, or one that used discover dedup) are caught by comparing the set
+    with the tag's distinct value count, which triggers a full scan
+    """
+
+    def __init__(self, sentry, cache_path = DEFAULT_CACHE_PATH, batch_size = 200, dry_run = False):
+        super().__init__(sentry, batch_size)
+        self.cache_path = cache_path
+        self.dry_run = dry_run
+        self.migrated = set()
+        self.last_seen = None
+        self.unsaved = 0
+        self.lock = threading.Lock()
+        self.load()
+        self.refresh()
+
+    def load(self):
+        if not os.path.exists(self.cache_path):
+            return
+
+        with open(self.cache_path) as f:
+            cache = json.load(f)
+
+        # The cache is only valid for the SaaS project it was built from
+        if cache.get("project") == self.get_project_key():
+            self.migrated = set(cache["values"])
+            self.last_seen = cache["last_seen"]
+
+    def refresh(self):
+        since = self.last_seen
+        if since is not None and self.sentry.get_tag_value_count("onprem_id") > len(self.migrated):
+            since = None
+
+        last_seen = self.last_seen
+        for value in self.sentry.get_tag_values("onprem_id", since = since):
+            self.migrated.add(value["value"])
+            if last_seen is None or value["lastSeen"] > last_seen:
+                last_seen = value["lastSeen"]
+
+        self.last_seen = last_seen
+        self.save()
+
+    def add(self, onprem_id):
+        with self.lock:
+            self.migrated.add(str(onprem_id))
+            self.unsaved += 1
+            if self.unsaved < self.batch_size:
+                return
+        self.save()
+
+    def save(self):
+        # Nothing is stored in SaaS in dry-mode, so the cache is left as it was
+        if self.dry_run:
+            return
+
+        with self.lock:
+            cache = {
+                "project" : self.get_project_key(),
+                "last_seen" : self.last_seen,
+                "values" : sorted(self.migrated)
+            }
+            self.unsaved = 0
+            with open(self.cache_path + ".tmp", "w") as f:
+                json.dump(cache, f)
+            os.replace(self.cache_path + ".tmp", self.cache_path)
+
+    def get_project_key(self):
+        return f'{self.sentry.saas_options["url"]}{self.sentry.saas_options["org_name"]}/{self.sentry.get_sass_project_name()}'
+
+    def prefetch(self, onprem_ids):
+        super().prefetch([id for id in onprem_ids if str(id) in self.migrated])
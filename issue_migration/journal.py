@@ -0,0 +1,94 @@
+import threading
+import sqlite3
+import json
+import time
+
+FETCHED = 1
+NORMALIZED = 2
+STORED = 3
+RESOLVED = 4
+METADATA_UPDATED = 5
+EXTERNAL_ISSUE_LINKED = 6
+
+DEFAULT_JOURNAL_PATH = "./migration_journal.db"
+
+class Journal:
+    """
+    SQLite (WAL mode) journal of the last stage each on-prem issue reached in a migration,
+    so an interrupted migration can be resumed with --resume=<migration_id>
+    """
+
+    def __init__(self, migration_id, path = DEFAULT_JOURNAL_PATH):
+        self.migration_id = str(migration_id)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread = False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS issues (
+                migration_id TEXT NOT NULL,
+                issue_id TEXT NOT NULL,
+                stage INTEGER NOT NULL,
+                saas_event_id TEXT,
+                saas_group_id TEXT,
+                issue_metadata TEXT,
+                integration_data TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (migration_id, issue_id)
+            )
+        """)
+        self.connection.commit()
+
+    def get(self, issue_id):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT stage, saas_event_id, saas_group_id, issue_metadata, integration_data FROM issues WHERE migration_id = ? AND issue_id = ?",
+                (self.migration_id, str(issue_id))
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            "stage" : row[0],
+            "event_id" : row[1],
+            "issue_id" : row[2],
+            "issue_metadata" : json.loads(row[3]) if row[3] is not None else None,
+            "integration_data" : json.loads(row[4]) if row[4] is not None else None
+        }
+
+    def get_stage(self, issue_id):
+        entry = self.get(issue_id)
+        return entry["stage"] if entry is not None else 0
+
+    def record(self, issue_id, stage, event_id = None, group_id = None, issue_metadata = None, integration_data = None):
+        """
+        Records that an issue reached `stage`. Stages never move backwards and
+        values that are not passed keep whatever was recorded before.
+        """
+        with self.lock:
+            self.connection.execute("""
+                INSERT INTO issues (migration_id, issue_id, stage, saas_event_id, saas_group_id, issue_metadata, integration_data, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (migration_id, issue_id) DO UPDATE SET
+                    stage = MAX(stage, excluded.stage),
+                    saas_event_id = COALESCE(excluded.saas_event_id, saas_event_id),
+                    saas_group_id = COALESCE(excluded.saas_group_id, saas_group_id),
+                    issue_metadata = COALESCE(excluded.issue_metadata, issue_metadata),
+                    integration_data = COALESCE(excluded.integration_data, integration_data),
+                    updated_at = excluded.updated_at
+            """, (
+                self.migration_id,
+                str(issue_id),
+                stage,
+                event_id,
+                str(group_id) if group_id is not None else None,
+                json.dumps(issue_metadata) if issue_metadata is not None else None,
+                json.dumps(integration_data) if integration_data is not None else None,
+                time.time()
+            ))
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -18,7 +18,11 @@ class CustomFormatter(logging.Formatter):
         logging.CRITICAL: bold_red + format + reset
     }
 
+    def __init__(self):
+        super().__init__()
+        # One formatter per level, built once instead of for every record
+        self.formatters = { level : logging.Formatter(log_fmt) for level, log_fmt in self.FORMATS.items() }
+
     def format(self, record):
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt)
-        return formatter.format(record)
\ No newline at end of file
+        formatter = self.formatters.get(record.levelno, self.formatters[logging.DEBUG])
+        return formatter.format(record)
@@ -1,76 +1,122 @@
-import logging
+from logging.handlers import QueueHandler, QueueListener
 from logger import customFormatter
 from logger import fileFormatter
+from logger import jsonFormatter
+from logger import sampleFilter
+from dotenv import load_dotenv
 from datetime import date
+import logging
+import atexit
+import queue
 import os
 
+DEFAULT_SAMPLE_BURST = 10
+
 class Logger:
+    """
+    Records are put on a queue and written to the console and the log file by a
+    listener thread, so logging never blocks the migration on terminal or disk I/O.
+    Call close (Done at exit otherwise) to flush the queue
+    """
+
     def __init__(self):
+        load_dotenv()
         today = date.today()
         if not os.path.exists("logger/logs/"):
             os.makedirs("logger/logs")
-            
-        self.file_name = f'logger/logs/{today}.txt'
-        self.cli_logger = self.get_cli_logger("migration-cli-logger")
-        self.file_logger = self.get_file_logger("migration-file-logger")
 
-    def get_cli_logger(self, logger_name):
-        cli_logger = logging.getLogger(logger_name)
-        cli_logger.setLevel(logging.DEBUG)
+        self.json_format = os.environ.get("LOG_FORMAT", "text").lower() == "json"
+        self.file_name = f'logger/logs/{today}.{"jsonl" if self.json_format else "txt"}'
+        self.queue = queue.SimpleQueue()
+        self.cli_logger = self.get_queue_logger("migration-cli-logger")
+        self.file_logger = self.get_queue_logger("migration-file-logger")
+
+        self.cli_handler = self.get_cli_handler(self.cli_logger.name)
+        self.file_handler = self.get_file_handler(self.file_logger.name)
+        self.listener = QueueListener(self.queue, self.cli_handler, self.file_handler, respect_handler_level = True)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def get_queue_logger(self, logger_name):
+        queue_logger = logging.getLogger(logger_name)
+        queue_logger.setLevel(logging.DEBUG)
+        queue_logger.handlers = [QueueHandler(self.queue)]
 
+        return queue_logger
+
+    def get_cli_handler(self, logger_name):
         # create console handler with a higher log level
         ch = logging.StreamHandler()
         ch.setLevel(logging.DEBUG)
-
         ch.setFormatter(customFormatter.CustomFormatter())
-        cli_logger.addHandler(ch)
+        # Both loggers share the queue, each handler only writes its own logger's records
+        ch.addFilter(logging.Filter(logger_name))
 
-        return cli_logger
-    
-    def get_file_logger(self, logger_name):
-        file_logger = logging.getLogger(logger_name)
-        file_logger.setLevel(logging.DEBUG)
+        return ch
 
-        
+    def get_file_handler(self, logger_name):
         fh = logging.FileHandler(self.file_name)
         fh.setLevel(logging.DEBUG)
-        fh.setFormatter(fileFormatter.FileFormatter())
-        file_logger.addHandler(fh)
+        fh.setFormatter(jsonFormatter.JsonFormatter() if self.json_format else fileFormatter.FileFormatter())
+        fh.addFilter(logging.Filter(logger_name))
+
+        self.sample_filter = None
+        sample_every = int(os.environ.get("LOG_SAMPLE_EVERY", 0))
+        if sample_every > 1:
+            self.sample_filter = sampleFilter.SampleFilter(sample_every, int(os.environ.get("LOG_SAMPLE_BURST", DEFAULT_SAMPLE_BURST)))
+            fh.addFilter(self.sample_filter)
 
-        return file_logger
+        return fh
+
+    def close(self):
+        if self.listener is None:
+            return
+
+        self.listener.stop()
+        self.listener = None
+        if self.sample_filter is not None and self.sample_filter.dropped > 0:
+            self.file_handler.handle(self.file_logger.makeRecord(self.file_logger.name, logging.INFO, __file__, 0, f'{self.sample_filter.dropped} repetitive lines were sampled out of this log', None, None))
+        self.file_handler.close()
 
     def info(self, text, file_only = False):
-        self.file_logger.info(text)
+        self.file_logger.info(text, stacklevel = 2)
         if not file_only:
             self.cli_logger.info(text)
         else:
             self.cli_logger.debug(f'Data printed in file {self.file_name}')
 
     def debug(self, text, file_only = False):
-        self.file_logger.debug(text)
+        self.file_logger.debug(text, stacklevel = 2)
         if not file_only:
             self.cli_logger.debug(text)
         else:
             self.cli_logger.debug(f'Data printed in file {self.file_name}')
 
     def warn(self, text, file_only = False):
-        self.file_logger.warning(text)
+        self.file_logger.warning(text, stacklevel = 2)
         if not file_only:
             self.cli_logger.warning(text)
         else:
             self.cli_logger.debug(f'Data printed in file {self.file_name}')
 
     def error(self, text, file_only = False):
-        self.file_logger.error(text)
+        self.file_logger.error(text, stacklevel = 2)
         if not file_only:
             self.cli_logger.error(text)
         else:
             self.cli_logger.debug(f'Data printed in file {self.file_name}')
 
     def critical(self, text, file_only = False):
-        self.file_logger.critical(text)
+        self.file_logger.critical(text, stacklevel = 2)
         if not file_only:
             self.cli_logger.critical(text)
         else:
             self.cli_logger.debug(f'Data printed in file {self.file_name}')
-    
\ No newline at end of file
+
+    def data(self, entries, text = "Issue data"):
+        """
+        Writes each entry to the file as its own line, instead of one giant string
+        """
+        for entry in entries:
+            self.file_logger.debug(text, extra = { "data" : entry }, stacklevel = 2)
+        self.cli_logger.debug(f'Data printed in file {self.file_name}')
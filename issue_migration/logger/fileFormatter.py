@@ -1,4 +1,5 @@
 import logging
+import json
 
 class FileFormatter(logging.Formatter):
 
@@ -18,7 +19,13 @@ class FileFormatter(logging.Formatter):
         logging.CRITICAL: format
     }
 
+    def __init__(self):
+        super().__init__()
+        self.formatters = { level : logging.Formatter(log_fmt) for level, log_fmt in self.FORMATS.items() }
+
     def format(self, record):
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt)
-        return formatter.format(record)
\ No newline at end of file
+        formatter = self.formatters.get(record.levelno, self.formatters[logging.DEBUG])
+        message = formatter.format(record)
+        if getattr(record, "data", None) is not None:
+            message = f'{message} {json.dumps(record.data, default = str)}'
+        return message
@@ -0,0 +1,25 @@
+from datetime import datetime, timezone
+import logging
+import json
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, for log files that are parsed rather than read
+    """
+
+    def format(self, record):
+        line = {
+            "time" : datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level" : record.levelname,
+            "message" : record.getMessage(),
+            "file" : record.filename,
+            "line" : record.lineno
+        }
+        if getattr(record, "data", None) is not None:
+            line["data"] = record.data
+        if getattr(record, "sampled", None) is not None:
+            # This line stands for `sampled` lines of the same kind
+            line["sampled"] = record.sampled
+        if record.exc_info:
+            line["exception"] = self.formatException(record.exc_info)
+        return json.dumps(line, default = str)
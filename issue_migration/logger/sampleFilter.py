@@ -0,0 +1,36 @@
+import logging
+import re
+
+# IDs, event IDs, counts and dates are what make two per-issue lines differ
+VARIABLE_PATTERN = re.compile(r"[0-9a-fA-F]{32}|[0-9a-fA-F-]{36}|\d+")
+
+class SampleFilter(logging.Filter):
+    """
+    Keeps the first `burst` debug/info lines of each kind, then one out of every
+    `every`. Lines of the same kind only differ by their numbers and IDs (E.g
+    `Issue successfully created in SaaS instance with ID ...`). Warnings, errors
+    and lines carrying data are always kept
+    """
+
+    def __init__(self, every, burst):
+        super().__init__()
+        self.every = every
+        self.burst = burst
+        self.counts = {}
+        self.dropped = 0
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or getattr(record, "data", None) is not None:
+            return True
+
+        kind = VARIABLE_PATTERN.sub("#", record.getMessage())
+        count = self.counts.get(kind, 0) + 1
+        self.counts[kind] = count
+        if count <= self.burst:
+            return True
+        if (count - self.burst) % self.every == 0:
+            record.sampled = self.every
+            return True
+
+        self.dropped += 1
+        return False
@@ -1,10 +1,14 @@
-from request import request
-from processor import normalize_issue
+from request import Client, DEFAULT_POOL_SIZE
 from logger import customLogger
 from sentry import Sentry
 from sentry import utils
+from pipeline import ordered_map, batched
+from scheduler import RateLimitScheduler
 import dryable
+import config
 import members
+import journal
+import metrics
 import sys
 import uuid
 import json
@@ -17,7 +21,6 @@ class Main:
         try:
             
             self.logger = customLogger.Logger()
-            self.sentry = Sentry.Sentry()
             self.memberObj = members.Members()
             self.migration_id = uuid.uuid4()
 
@@ -26,7 +29,42 @@ class Main:
             if cli_args == False:
                 return
 
+            self.command = utils.get_command(cli_args)
+            utils.check_env(self.command)
             self.dry_run = "--dry-run" in cli_args
+            self.concurrency = utils.get_concurrency(cli_args, self.logger)
+            self.fingerprint = utils.get_cli_arg(cli_args, "--fingerprint", os.environ.get("FINGERPRINT", "false")).lower() == "true"
+            # import replays an archive, the other commands fetch issues from on-prem
+            filters = None
+            if self.command != "import":
+                filters = utils.get_request_filters(sys.argv, self.logger)
+                if filters is None:
+                    raise Exception("Invalid CLI arguments")
+
+            max_in_flight = self.get_max_in_flight(filters)
+            pool_size = max_in_flight if max_in_flight > DEFAULT_POOL_SIZE else None
+            self.client = Client(pool_size = pool_size, scheduler = RateLimitScheduler(max_concurrency = max_in_flight))
+            prometheus_path = os.environ.get("PROMETHEUS_TEXTFILE")
+            if prometheus_path:
+                self.client.metrics.start_exporter(prometheus_path, float(os.environ.get("PROMETHEUS_INTERVAL", metrics.DEFAULT_PROMETHEUS_INTERVAL)))
+            self.sentry = Sentry.Sentry(self.client, utils.get_query_builder(cli_args), utils.get_transport(cli_args, self.logger), fetch_concurrency = self.concurrency)
+            self.normalizer = config.get_normalizer(cli_args, self.logger)
+
+            if self.command == "export":
+                self.export_issues(({ "issue" : issue } for issue in self.sentry.get_issues_to_migrate(filters)), cli_args)
+                return
+
+            resume_id = utils.get_cli_arg(cli_args, "--resume")
+            if resume_id is not None:
+                self.migration_id = resume_id
+                self.logger.debug(f'Resuming migration with ID {self.migration_id}')
+            else:
+                self.logger.debug(f'Starting migration with ID {self.migration_id} (Use --resume={self.migration_id} to resume it if interrupted)')
+
+            # Nothing is stored in SaaS in dry-mode, so progress is not persisted
+            journal_path = ":memory:" if self.dry_run else os.environ.get("JOURNAL_PATH", journal.DEFAULT_JOURNAL_PATH)
+            self.journal = journal.Journal(self.migration_id, journal_path)
+            self.dedup = config.get_dedup(cli_args, self.sentry, self.logger)
             dryable.set(self.dry_run)
 
             if self.dry_run:
@@ -35,220 +73,466 @@ class Main:
             self.memberObj.populate_members(self.sentry.get_org_members())
             self.memberObj.populate_teams(self.sentry.get_org_teams())
 
-            filters = utils.get_request_filters(sys.argv, self.logger)
-            if filters is None:
-                raise Exception("Invalid CLI arguments")
-
-            issues = self.sentry.get_issues_to_migrate(filters)
-            if issues is None or len(issues) == 0:
-                raise Exception("Issues list is empty")
+            if self.command == "import":
+                reader = config.get_archive_reader(cli_args)
+                if not reader.index["complete"]:
+                    self.logger.warn(f'Archive {reader.path} is incomplete - Only the issues exported before it was interrupted (At least {reader.index["issues"]}) will be imported')
+                records = reader.read()
+                source_name = reader.index["source"]["project_name"]
+            else:
+                records = ({ "issue" : issue } for issue in self.sentry.get_issues_to_migrate(filters))
+                if filters["fetch_release"]:
+                    records = self.enrich_releases(records)
+                source_name = self.sentry.get_on_prem_project_name()
             
-            self.logger.debug(f'Ready to migrate {len(issues)} issues from {self.sentry.get_on_prem_project_name()} to {self.sentry.get_sass_project_name()}')
-            metadata = self.create_issues_on_sass(issues)
+            self.logger.debug(f'Ready to migrate issues from {source_name} to {self.sentry.get_sass_project_name()}')
+            metadata = self.create_issues_on_sass(records)
+            self.print_missing_issues()
+            if self.issue_count == 0:
+                raise Exception("Issues list is empty")
+
             if metadata is not None:
                 if self.dry_run:
                     self.print_issue_data(metadata)
+                    if filters is not None:
+                        self.print_fetch_savings(filters)
                 else:
                     self.update_issues(metadata)
                 
                     discover_query = self.sentry.build_discover_query(self.migration_id)
                     self.logger.debug(f'Issues migrated discover query {discover_query}')
 
+            self.logger.debug(f'Lookup cache stats {self.sentry.cache.stats()}')
+            self.print_upload_stats()
+
         except Exception as e:
             self.logger.critical(str(e))
+        finally:
+            if getattr(self, "normalizer", None) is not None:
+                self.normalizer.close()
+            if getattr(self, "journal", None) is not None:
+                self.journal.close()
+            if getattr(self, "dedup", None) is not None:
+                self.dedup.save()
+            if getattr(self, "client", None) is not None:
+                self.write_metrics()
+            if getattr(self, "logger", None) is not None:
+                self.logger.close()
+
+    def get_max_in_flight(self, filters):
+        """
+        Requests that can be in flight at once, the ceiling of the rate limit scheduler:
+        One per migration thread, plus the threads fetching issues by ID and looking up
+        releases ahead of them, plus the main thread (Stages with a concurrency of 1 run
+        in the thread that reads them)
+        """
+        def stage_threads(concurrency):
+            return concurrency if concurrency > 1 else 0
+
+        in_flight = 1 + stage_threads(self.concurrency)
+        if filters is not None and "issues" in filters:
+            in_flight += stage_threads(self.concurrency)
+        if filters is not None and filters["fetch_release"] and self.command != "export":
+            in_flight += stage_threads(self.get_release_concurrency())
+        return in_flight
+
+    def write_metrics(self):
+        self.client.metrics.stop_exporter()
+        metrics_path = os.environ.get("METRICS_PATH", metrics.DEFAULT_SUMMARY_PATH)
+        self.client.metrics.write_summary(metrics_path)
+        self.logger.debug(f'Request metrics per endpoint written to {metrics_path}')
 
     def update_issues(self, metadata):
-        event_ids = [data["event_id"] for data in metadata]
-        response = self.sentry.get_issue_ids_from_events(event_ids)
+        # Issues resumed from the journal may already know their SaaS issue ID
+        resumed = [data for data in metadata if data.get("issue_id") is not None]
+        self.update_issues_metadata((data["issue_id"], data) for data in resumed)
+
+        pending = [data for data in metadata if data.get("issue_id") is None]
+        if len(pending) == 0:
+            return
+
+        if self.fingerprint:
+            response = self.sentry.get_issue_ids_from_onprem_ids({ data["onprem_id"] : data["event_id"] for data in pending })
+        else:
+            response = self.sentry.get_issue_ids_from_events([data["event_id"] for data in pending])
         if len(response["failed_event_ids"]) > 0:
             self.logger.warn(f'Could not find events with IDs {str(response["failed_event_ids"])} in {self.sentry.get_sass_project_name()} SaaS')
         
+        metadata_by_event = { data["event_id"] : data for data in pending }
         if len(response["issues"]) == 0:
             self.logger.warn(f'Could not find new IDs in {self.sentry.get_sass_project_name()} SaaS')
         else:
-            self.get_issue_metadata(response["issues"], metadata)
+            self.get_issue_metadata(response["issues"], metadata_by_event)
 
         if len(response["failed_event_ids"]) > 0:
             self.logger.debug(f'Retrying failed events {str(response["failed_event_ids"])}')
             response = self.sentry.get_issue_ids_from_failed_events(response["failed_event_ids"])
+            if len(response["unresolved_event_ids"]) > 0:
+                self.logger.warn(f'Could not find events with IDs {str(response["unresolved_event_ids"])} in {self.sentry.get_sass_project_name()} SaaS after retrying')
+
             if len(response["issues"]) == 0:
                 self.logger.warn(f'Could not find new IDs in {self.sentry.get_sass_project_name()} SaaS')
                 return
             else:
-                self.get_issue_metadata(response["issues"], metadata)
+                self.get_issue_metadata(response["issues"], metadata_by_event)
     
-    def get_issue_metadata(self, issues, metadata):
+    def get_issue_metadata(self, issues, metadata_by_event):
+        updates = []
         for issue in issues:
             issue_id = issue["issue_id"]
-            event_id = issue["event_id"]
-            issue_metadata = utils.get_issue_attr(event_id, metadata, "issue_metadata")
-            integration_data = utils.get_issue_attr(event_id, metadata, "integration_data")
+            data = metadata_by_event.get(issue["event_id"])
 
-            if issue_metadata is None:
+            if data is None or data["issue_metadata"] is None:
                 self.logger.warn(f'Could not update SaaS issue with ID {issue_id} (Issue created but not updated) - Skipping...')
                 continue
 
-            self.update_issue_metadata(issue_id, issue_metadata, integration_data)
-    
-    def update_issue_metadata(self, issue_id, issue_metadata, integration_data):
-        response = self.sentry.update_issue(issue_id, issue_metadata)
-        if response is not None and "id" in response:
-            self.logger.info(f'SaaS Issue with ID {issue_id} metadata updated succesfully!')
-        else:
-            self.logger.error(f'SaaS Issue with ID {issue_id} metadata could not be updated')
+            self.journal.record(data["onprem_id"], journal.RESOLVED, group_id = issue_id)
+            updates.append((issue_id, data))
+
+        self.update_issues_metadata(updates)
+
+    def update_issues_metadata(self, updates):
+        """
+        Runs update_issue_metadata for every (SaaS issue ID, metadata) pair, updating
+        up to `concurrency` issues at once
+        """
+        def update(item):
+            issue_id, data = item
+            self.update_issue_metadata(issue_id, data["issue_metadata"], data["integration_data"], data["onprem_id"])
+
+        for _ in ordered_map(update, updates, self.concurrency):
+            pass
+
+    def update_issue_metadata(self, issue_id, issue_metadata, integration_data, onprem_id):
+        stage = self.journal.get_stage(onprem_id)
+        metadata_updated = stage >= journal.METADATA_UPDATED
+        if not metadata_updated:
+            response = self.sentry.update_issue(issue_id, issue_metadata)
+            if response is not None and "id" in response:
+                self.logger.info(f'SaaS Issue with ID {issue_id} metadata updated succesfully!')
+                self.journal.record(onprem_id, journal.METADATA_UPDATED)
+                metadata_updated = True
+            else:
+                self.logger.error(f'SaaS Issue with ID {issue_id} metadata could not be updated')
 
         if integration_data["external_issue"] is not None:
             saas_integration_id = self.sentry.get_saas_integration_id("JIRA", {"key": "domainName", "value" : integration_data["domain_name"]})
             external_issues_response = self.sentry.update_external_issues(issue_id, integration_data, saas_integration_id)
             if external_issues_response is not None and "id" in external_issues_response and external_issues_response["id"] is not None:
                 self.logger.info(f'SaaS Issue with ID {issue_id} external issues updated succesfully!')
+                if metadata_updated:
+                    self.journal.record(onprem_id, journal.EXTERNAL_ISSUE_LINKED)
             else:
                 self.logger.error(f'SaaS Issue with ID {issue_id} external issues could not be updated')
         else:
             self.logger.debug(f'No external issues linked to Issue with ID {issue_id}')
+            if metadata_updated:
+                self.journal.record(onprem_id, journal.EXTERNAL_ISSUE_LINKED)
+
+    def export_issues(self, records, cli_args):
+        """
+        Writes the on-prem data of every issue to an archive that `import` replays to SaaS
+        later, fetching up to `concurrency` issues at once
+        """
+        writer = config.get_archive_writer(cli_args, {
+            "url" : self.sentry.on_prem_options["url"],
+            "org_name" : self.sentry.on_prem_options["org_name"],
+            "project_name" : self.sentry.get_on_prem_project_name()
+        })
+        self.logger.debug(f'Exporting issues from {self.sentry.get_on_prem_project_name()} to {writer.path}')
+        self.issue_count = 0
+        complete = False
+
+        try:
+            for record in ordered_map(self.export_issue, enumerate(records), self.concurrency):
+                self.issue_count += 1
+                if record is None:
+                    continue
 
-    def create_issues_on_sass(self, issues):
-        f = open('./output.json', "w")
-        test_data = []
+                if "failed_issue_id" in record:
+                    writer.add_failed_issue(record["failed_issue_id"])
+                else:
+                    writer.write(record)
+            complete = True
+        finally:
+            for issue_id in self.sentry.missing_issue_ids:
+                writer.add_failed_issue(issue_id)
+            writer.close(complete)
+
+        if self.issue_count == 0:
+            raise Exception("Issues list is empty")
+
+        self.logger.info(f'Exported {writer.index["issues"]} issues to {writer.path} ({len(writer.index["failed_issues"])} failed)')
+        self.print_missing_issues()
+        if len(writer.index["failed_issues"]) > 0:
+            self.logger.warn(f'Could not export issues with IDs {str(writer.index["failed_issues"])}')
+
+    def export_issue(self, item):
+        index, record = item
+        issue = record["issue"]
+        if issue["id"] is None or issue.get("type") == "transaction":
+            return None
+
+        try:
+            self.logger.debug(f'Exporting issue with ID {issue["id"]} (#{index+1})')
+            # Raw events are written to the archive as they came from on-prem
+            return self.fetch_issue_data(record, raw = True)
+        except Exception as e:
+            self.logger.error(f'Could not export issue with ID {issue["id"]} - {str(e)}')
+            return { "failed_issue_id" : issue["id"] }
+
+    def fetch_issue_data(self, record, raw):
+        """
+        Fetches what is missing from `record` (The release, latest event and integrations
+        of its issue) from on-prem. Records read from an archive already hold all of it
+        """
+        issue = record["issue"]
+        if "release" not in record:
+            record["release"] = self.get_issue_release(issue)
+
+        if "event" not in record:
+            record["event"] = self.sentry.get_latest_event_from_issue(issue["id"], raw = raw)
+        elif raw and not isinstance(record["event"], bytes):
+            record["event"] = json.dumps(record["event"]).encode("utf-8")
+
+        if "integrations" not in record:
+            record["integrations"] = self.sentry.get_issue_integrations(issue["id"])
+
+        return record
+
+    def create_issues_on_sass(self, records):
+        output = config.get_output_writer()
         metadata = []
-        
-        for index, issue in enumerate(issues):
-            try:
-                if issue["id"] is not None:
-                    if "type" in issue and issue["type"] == "transaction":
-                            continue
-                        
-                    self.logger.debug(f'Fetching data from issue with ID {issue["id"]} ({index+1}/{len(issues)})')
-
-                    release = {}
-                    if "firstRelease" in issue:
-                        release["first"] = issue["firstRelease"]["version"] if "version" in issue["firstRelease"] else None
-                    else:
-                        releasesResponse = self.sentry.get_issue_releases(issue["id"])
-                        if releasesResponse is not None and len(releasesResponse) != 0:
-                            release["first"] = releasesResponse["firstRelease"]["shortVersion"]
-
-                    # 2) Get the latest event for each of the issues
-                    latest_event = self.sentry.get_latest_event_from_issue(issue["id"])
-
-                    if "level" in issue:
-                        issueData = {
-                            "level" : issue["level"] or "error",
-                            "firstSeen" : issue["firstSeen"],
-                            "lastSeen" : issue["lastSeen"],
-                            "release" : release,
-                            "id" : issue["id"],
-                            "migration_id" : str(self.migration_id)
-                        }
-                    else:
-                        self.logger.warn("No level attribute found in issue data object")
-
-                    # 3) Normalize and construct payload to send to SAAS
-                    payload = normalize_issue(latest_event, issueData)
-                    if ("error" in payload) or ("exception" in payload and payload["exception"] is None):
-                        self.logger.error(payload["error"] if "error" in payload else f'Could not normalize issue payload with ID {issue["id"]} - Skipping...')
-                        continue
-                    
-                    self.logger.info(f'Data normalized correctly for Issue with ID {issue["id"]}')
-
-                    existingEvent = self.sentry.get_issue_by_id(issue["id"])
-                    existingIssueID = None
-                    if len(existingEvent["data"]) > 0:
-                        existingId = existingEvent["data"][0]["id"]
-                        issue_response = self.sentry.get_issue_id_from_event_id(existingId)
-                        if "groupID" in issue_response:
-                            existingIssueID = issue_response["groupID"]
-
-                    else:
-                        eventResponse = self.sentry.store_event(payload)
-
-                        if not self.dry_run and (eventResponse is None or "id" not in eventResponse or eventResponse["id"] is None):
-                            self.logger.error(f'Could not store new event in SaaS instance - Skipping...')
-                            continue
-
-                    issue_metadata = {}
-                    integration_data = {}
-
-                    if "firstSeen" in issue and issue["firstSeen"] is not None:
-                        issue_metadata["firstSeen"] = issue["firstSeen"]
-                    else:
-                        self.logger.warn(f'firstSeen property could not be added to SaaS issue with ID {issue["id"]}')
-                    
-                    if "lastSeen" in issue and issue["lastSeen"] is not None:
-                        issue_metadata["lastSeen"] = issue["lastSeen"]
-                    else:
-                        self.logger.warn(f'lastSeen property could not be added to SaaS issue with ID {issue["id"]}')
-                    
-                    if "assignedTo" in issue and issue["assignedTo"] is not None:
-                        if issue["assignedTo"]["type"] == "team":
-                            team_name = issue["assignedTo"]["name"]
-                            team_id = self.memberObj.getTeamID(team_name)
-                            if team_id is not None:
+        self.issue_count = 0
+
+        try:
+            results = ordered_map(lambda item: self.migrate_issue(item[0], item[1]), enumerate(self.find_existing_issues(records)), self.concurrency)
+            for result in results:
+                self.issue_count += 1
+                if result is None:
+                    continue
+
+                if result["test_data"] is not None:
+                    output.write(result["test_data"])
+                if result["metadata"] is not None:
+                    metadata.append(result["metadata"])
+        finally:
+            output.close()
+
+        return metadata
+
+    def find_existing_issues(self, records):
+        """
+        Looks up which issues already exist in SaaS one batch at a time, as issues stream in
+        """
+        for batch in batched(records, self.dedup.batch_size):
+            onprem_ids = [record["issue"]["id"] for record in batch if record["issue"]["id"] is not None and self.journal.get_stage(record["issue"]["id"]) < journal.STORED]
+            if len(onprem_ids) > 0:
+                self.dedup.prefetch(onprem_ids)
+            yield from batch
+
+    def enrich_releases(self, records):
+        """
+        Looks up the release of every issue in its own stage, ahead of the migration
+        threads, running up to `RELEASE_CONCURRENCY` lookups at once
+        """
+        def enrich(record):
+            issue = record["issue"]
+            if issue["id"] is not None and self.journal.get_stage(issue["id"]) < journal.STORED:
+                try:
+                    record["release"] = self.get_issue_release(issue)
+                except Exception as e:
+                    # migrate_issue looks it up again
+                    self.logger.warn(f'Could not fetch release of issue with ID {issue["id"]} - {str(e)}')
+            return record
+
+        return ordered_map(enrich, records, self.get_release_concurrency())
+
+    def get_release_concurrency(self):
+        return int(os.environ.get("RELEASE_CONCURRENCY", self.concurrency))
+
+    def get_issue_release(self, issue):
+        if issue.get("firstRelease") is not None:
+            return { "first" : issue["firstRelease"].get("version") }
+        return self.sentry.get_issue_release_versions(issue["id"]) or {}
+
+    def migrate_issue(self, index, record):
+        try:
+            issue = record["issue"]
+            if issue["id"] is not None:
+                if "type" in issue and issue["type"] == "transaction":
+                    return None
+
+                entry = self.journal.get(issue["id"])
+                if entry is not None and entry["stage"] >= journal.STORED:
+                    return self.resume_issue(issue["id"], entry)
+
+                self.logger.debug(f'Fetching data from issue with ID {issue["id"]} (#{index+1})')
+
+                # 2) Get the release, latest event and integrations of each issue
+                record = self.fetch_issue_data(record, raw = self.normalizer.raw)
+                release = record["release"]
+                latest_event = record["event"]
+                self.journal.record(issue["id"], journal.FETCHED)
+
+                if "level" in issue:
+                    issueData = {
+                        "level" : issue["level"] or "error",
+                        "firstSeen" : issue["firstSeen"],
+                        "lastSeen" : issue["lastSeen"],
+                        "release" : release,
+                        "id" : issue["id"],
+                        "migration_id" : str(self.migration_id),
+                        "fingerprint" : self.fingerprint
+                    }
+                else:
+                    self.logger.warn("No level attribute found in issue data object")
+
+                # 3) Normalize and construct payload to send to SAAS
+                normalized = self.normalizer.normalize(latest_event, issueData)
+                if "error" in normalized:
+                    self.logger.error(normalized["error"])
+                    return None
+                
+                self.logger.info(f'Data normalized correctly for Issue with ID {issue["id"]}')
+                self.journal.record(issue["id"], journal.NORMALIZED, event_id = normalized["event_id"])
+
+                issue_metadata = {}
+                integration_data = {}
+
+                if "firstSeen" in issue and issue["firstSeen"] is not None:
+                    issue_metadata["firstSeen"] = issue["firstSeen"]
+                else:
+                    self.logger.warn(f'firstSeen property could not be added to SaaS issue with ID {issue["id"]}')
+                
+                if "lastSeen" in issue and issue["lastSeen"] is not None:
+                    issue_metadata["lastSeen"] = issue["lastSeen"]
+                else:
+                    self.logger.warn(f'lastSeen property could not be added to SaaS issue with ID {issue["id"]}')
+                
+                if "assignedTo" in issue and issue["assignedTo"] is not None:
+                    if issue["assignedTo"]["type"] == "team":
+                        team_name = issue["assignedTo"]["name"]
+                        team_id = self.memberObj.getTeamID(team_name)
+                        if team_id is not None:
+                            issue_metadata["assignedBy"] = "assignee_selector"
+                            issue_metadata["assignedTo"] = "team:" + team_id
+                    elif issue["assignedTo"]["type"] == "user":
+                        if "email" not in issue["assignedTo"] or issue["assignedTo"]["email"] is None:
+                            self.logger.warn(f'Issue assignee\'s email from on-prem issue with ID {issue["id"]} was not found')
+                        else:
+                            userEmail = issue["assignedTo"]["email"]
+                            userId = self.memberObj.getUserID(userEmail)
+                            if userId is not None:
                                 issue_metadata["assignedBy"] = "assignee_selector"
-                                issue_metadata["assignedTo"] = "team:" + team_id
-                        elif issue["assignedTo"]["type"] == "user":
-                            if "email" not in issue["assignedTo"] or issue["assignedTo"]["email"] is None:
-                                self.logger.warn(f'Issue assignee\'s email from on-prem issue with ID {issue["id"]} was not found')
+                                issue_metadata["assignedTo"] = "user:" + userId
                             else:
-                                userEmail = issue["assignedTo"]["email"]
-                                userId = self.memberObj.getUserID(userEmail)
-                                if userId is not None:
-                                    issue_metadata["assignedBy"] = "assignee_selector"
-                                    issue_metadata["assignedTo"] = "user:" + userId
-                                else:
-                                    self.logger.warn(f'Could not find the ID of user with email {userEmail} - Skipping issue assignee')
-                    else:
-                        self.logger.warn(f'On-prem issue with ID {issue["id"]} does not contain property "assignedTo" - Skipping issue assignee')
-
-                    integration_data = self.sentry.get_integration_data("JIRA", issue["id"])
-                    
-                    obj = {
-                        "issue" : issue,
-                        "event" : latest_event,
-                        "integration_data": integration_data["raw_data"]
+                                self.logger.warn(f'Could not find the ID of user with email {userEmail} - Skipping issue assignee')
+                else:
+                    self.logger.warn(f'On-prem issue with ID {issue["id"]} does not contain property "assignedTo" - Skipping issue assignee')
+
+                integration_data = self.sentry.process_integrations_response(record["integrations"], "JIRA")
+                
+                test_data = {
+                    "issue" : issue,
+                    "event" : latest_event,
+                    "integration_data": integration_data["raw_data"]
+                }
+
+                integration_data = integration_data["keys"]
+
+                existingIssueID = self.dedup.get(issue["id"])
+                if existingIssueID is None:
+                    eventResponse = self.sentry.store_normalized_event(normalized)
+
+                    if not self.dry_run and (eventResponse is None or "id" not in eventResponse or eventResponse["id"] is None):
+                        self.logger.error(f'Could not store new event in SaaS instance - Skipping...')
+                        return None
+
+                    if not self.dry_run:
+                        self.journal.record(issue["id"], journal.STORED, event_id = eventResponse["id"], issue_metadata = issue_metadata, integration_data = integration_data)
+                        self.dedup.add(issue["id"])
+
+                if existingIssueID is not None and not self.dry_run:
+                    self.logger.debug(f'Issue already created in SaaS instance with ID {existingIssueID} - Only updating issue with metadata')
+                    self.journal.record(issue["id"], journal.RESOLVED, group_id = existingIssueID, issue_metadata = issue_metadata, integration_data = integration_data)
+                    self.update_issue_metadata(existingIssueID, issue_metadata, integration_data, issue["id"])
+                    return {
+                        "test_data" : test_data,
+                        "metadata" : None
                     }
-                    test_data.append(obj)
-
-                    integration_data = integration_data["keys"]
-
-                    if existingIssueID is not None and not self.dry_run:
-                        self.logger.debug(f'Issue already created in SaaS instance with ID {existingIssueID} - Only updating issue with metadata')
-                        self.update_issue_metadata(existingIssueID, issue_metadata, integration_data)
-                        continue
-
-                    if self.dry_run:
-                        obj = {
-                            "issue_skeleton" : payload,
-                            "issue_metadata" : issue_metadata,
-                            "integration_data" : integration_data
-                        }
-                        metadata.append(obj)
-                    else:
-                        self.logger.info(f'Issue successfully created in SaaS instance with ID {eventResponse["id"]}')
-                        obj = {
-                            "event_id" : eventResponse["id"],
-                            "issue_metadata" : issue_metadata,
-                            "integration_data" : integration_data
-                        }
-                        metadata.append(obj)
-
-                    f.close()
-                    f = open('./output.json', "w")
-                    f.write(json.dumps(test_data))
-                    
 
+                if self.dry_run:
+                    obj = {
+                        "issue_skeleton" : normalized["payload"] if normalized["body"] is None else json.loads(normalized["body"]),
+                        "issue_metadata" : issue_metadata,
+                        "integration_data" : integration_data
+                    }
                 else:
-                    raise Exception("Issue ID not found")
-            except Exception as e:
-                exc_type, exc_obj, exc_tb = sys.exc_info()
-                fname = os.path.split(exc_tb.tb_frame.f_code.co_filename)[1]
-                print(exc_type, fname, exc_tb.tb_lineno)
+                    self.logger.info(f'Issue successfully created in SaaS instance with ID {eventResponse["id"]}')
+                    obj = {
+                        "event_id" : eventResponse["id"],
+                        "onprem_id" : issue["id"],
+                        "issue_metadata" : issue_metadata,
+                        "integration_data" : integration_data
+                    }
 
-        #f.write(json.dumps(test_data))
-        return metadata
+                return {
+                    "test_data" : test_data,
+                    "metadata" : obj
+                }
+
+            else:
+                raise Exception("Issue ID not found")
+        except Exception as e:
+            exc_type, exc_obj, exc_tb = sys.exc_info()
+            fname = os.path.split(exc_tb.tb_frame.f_code.co_filename)[1]
+            print(exc_type, fname, exc_tb.tb_lineno)
+
+        return None
+
+    def resume_issue(self, issue_id, entry):
+        if entry["stage"] >= journal.EXTERNAL_ISSUE_LINKED:
+            self.logger.debug(f'Issue with ID {issue_id} was already migrated - Skipping...')
+            return None
+
+        self.logger.debug(f'Resuming issue with ID {issue_id} from journal')
+        return {
+            "test_data" : None,
+            "metadata" : {
+                "event_id" : entry["event_id"],
+                "issue_id" : entry["issue_id"],
+                "onprem_id" : issue_id,
+                "issue_metadata" : entry["issue_metadata"],
+                "integration_data" : entry["integration_data"]
+            }
+        }
 
     def print_issue_data(self, data):
-        self.logger.debug(data, True)
+        self.logger.data(data)
+
+    def print_missing_issues(self):
+        if len(self.sentry.missing_issue_ids) > 0:
+            self.logger.warn(f'Could not find issues with IDs {str(self.sentry.missing_issue_ids)} in on-prem {self.sentry.get_on_prem_project_name()} - Skipping...')
+
+    def print_upload_stats(self):
+        stats = self.sentry.upload_stats
+        if stats["events"] == 0:
+            return
+
+        saved = 100 - stats["sent_bytes"] * 100 / max(stats["raw_bytes"], 1)
+        self.logger.debug(f'Sent {stats["events"]} events to SaaS: {stats["raw_bytes"]} bytes raw, {stats["sent_bytes"]} bytes sent ({saved:.1f}% saved)')
+
+    def print_fetch_savings(self, filters):
+        stats = self.sentry.issue_fetch_stats
+        self.logger.debug(f'Fetched {stats["issues"]} issues in {stats["pages"]} pages ({stats["bytes"]} bytes) from on-prem')
+
+        unfiltered = self.sentry.estimate_unfiltered_fetch(filters)
+        if unfiltered is None:
+            self.logger.warn('Could not estimate the pages and bytes saved by server-side filters')
+            return
+
+        self.logger.debug(f'Server-side filters saved ~{max(unfiltered["pages"] - stats["pages"], 0)} pages and ~{max(unfiltered["bytes"] - stats["bytes"], 0)} bytes')
 
 if __name__ == "__main__":
     main = Main()
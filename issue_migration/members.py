@@ -1,26 +1,65 @@
+from types import MappingProxyType
+
+class Member:
+    __slots__ = ("email", "user_id")
+
+    def __init__(self, email, user_id):
+        self.email = email
+        self.user_id = user_id
+
+    def __repr__(self):
+        return f'Member(email={self.email!r}, user_id={self.user_id!r})'
+
+class Team:
+    __slots__ = ("id", "slug", "name")
+
+    def __init__(self, id, slug, name):
+        self.id = id
+        self.slug = slug
+        self.name = name
+
+    def __repr__(self):
+        return f'Team(id={self.id!r}, slug={self.slug!r}, name={self.name!r})'
+
 class Members:
 
     def populate_members(self, members):
-        self.members = members
+        records = []
+        index = {}
+        for member in members:
+            if member.get("user") is None:
+                continue
+            record = Member(member["email"], member["user"]["id"])
+            records.append(record)
+            # Keep the first match, like a linear scan would
+            index.setdefault(record.email, record.user_id)
+
+        self.members = tuple(records)
+        self.member_index = MappingProxyType(index)
 
     def populate_teams(self, teams):
-        self.teams = teams
+        records = []
+        index = {}
+        for team in teams:
+            record = Team(team["id"], team["slug"], team["name"])
+            records.append(record)
+            index.setdefault(record.slug.lower(), record.id)
+            index.setdefault(record.name.lower(), record.id)
+
+        self.teams = tuple(records)
+        self.team_index = MappingProxyType(index)
 
     def getUserID(self, email):
         if email is not None:
-            for member in self.members:
-                if member["email"] == email:
-                    return member["user"]["id"]
+            return self.member_index.get(email)
         return None
 
     def getTeamID(self, name):
         if name is not None:
-            for team in self.teams:
-                if team["slug"].lower() == name.lower() or team["name"].lower() == name.lower():
-                    return team["id"]
+            return self.team_index.get(name.lower())
 
         return None
 
 
     def print(self):
-        print(self.members)
\ No newline at end of file
+        print(self.members)
@@ -0,0 +1,177 @@
+from urllib.parse import urlparse
+from scheduler import get_endpoint_group
+import threading
+import json
+import os
+import re
+
+DEFAULT_SUMMARY_PATH = "./migration_metrics.json"
+DEFAULT_PROMETHEUS_INTERVAL = 15
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Logical endpoint of each request, first match wins
+ENDPOINTS = [
+    ("GET", r"/projects/[^/]+/[^/]+/issues/$", "issues"),
+    ("GET", r"/issues/[^/]+/events/latest/$", "events/latest"),
+    ("GET", r"/issues/[^/]+/first-last-release/$", "first-last-release"),
+    ("GET", r"/issues/[^/]+/$", "issue"),
+    ("PUT", r"/issues/[^/]+/$", "issue/update"),
+    ("GET", r"/groups/[^/]+/integrations/$", "groups/integrations"),
+    ("PUT", r"/groups/[^/]+/integrations/[^/]+/$", "groups/integrations/update"),
+    ("GET", r"/organizations/[^/]+/integrations/$", "integrations"),
+    ("GET", r"/organizations/[^/]+/events/$", "discover"),
+    ("GET", r"/projects/[^/]+/[^/]+/events/[^/]+/$", "project/event"),
+    ("GET", r"/projects/[^/]+/[^/]+/events/$", "project/events"),
+    ("GET", r"/projects/[^/]+/[^/]+/tags/[^/]+/values/$", "tags/values"),
+    ("GET", r"/organizations/[^/]+/users/$", "members"),
+    ("GET", r"/organizations/[^/]+/teams/$", "teams"),
+    ("POST", r"/api/\d+/store/$", "store"),
+    ("POST", r"/api/\d+/envelope/$", "envelope")
+]
+
+COMPILED_ENDPOINTS = [(method, re.compile(pattern), name) for method, pattern, name in ENDPOINTS]
+
+def get_endpoint_name(url, method):
+    path = urlparse(url).path
+    for endpoint_method, pattern, name in COMPILED_ENDPOINTS:
+        if endpoint_method == method and pattern.search(path) is not None:
+            return name
+    return f'{method} {get_endpoint_group(url)}'
+
+class EndpointMetrics:
+    __slots__ = ("requests", "statuses", "bytes_sent", "bytes_received", "latency_sum", "latency_max", "latency_buckets")
+
+    def __init__(self):
+        self.requests = 0
+        self.statuses = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency_sum = 0
+        self.latency_max = 0
+        # Count per bucket (not cumulative), the last one being +Inf
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+class Metrics:
+    """
+    Request counts, status codes, bytes sent/received and latency histograms per
+    logical endpoint (issues, events/latest, envelope, discover...), recorded by
+    request.Client for every request it sends
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.exporter = None
+
+    def record(self, url, method, status, bytes_sent, bytes_received, latency):
+        name = get_endpoint_name(url, method)
+        bucket = len(LATENCY_BUCKETS)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                bucket = index
+                break
+
+        with self.lock:
+            endpoint = self.endpoints.get(name)
+            if endpoint is None:
+                endpoint = self.endpoints.setdefault(name, EndpointMetrics())
+            endpoint.requests += 1
+            endpoint.statuses[status] = endpoint.statuses.get(status, 0) + 1
+            endpoint.bytes_sent += bytes_sent
+            endpoint.bytes_received += bytes_received
+            endpoint.latency_sum += latency
+            endpoint.latency_max = max(endpoint.latency_max, latency)
+            endpoint.latency_buckets[bucket] += 1
+
+    def summary(self):
+        with self.lock:
+            endpoints = {}
+            for name, endpoint in sorted(self.endpoints.items()):
+                endpoints[name] = {
+                    "requests" : endpoint.requests,
+                    "statuses" : { str(status) : count for status, count in sorted(endpoint.statuses.items(), key = lambda item: str(item[0])) },
+                    "bytes_sent" : endpoint.bytes_sent,
+                    "bytes_received" : endpoint.bytes_received,
+                    "latency_seconds" : {
+                        "mean" : round(endpoint.latency_sum / endpoint.requests, 6) if endpoint.requests > 0 else 0,
+                        "max" : round(endpoint.latency_max, 6),
+                        "buckets" : { str(bound) : count for bound, count in zip(list(LATENCY_BUCKETS) + ["+Inf"], endpoint.latency_buckets) }
+                    }
+                }
+        return endpoints
+
+    def to_prometheus(self):
+        with self.lock:
+            lines = [
+                "# HELP issue_migration_requests_total Requests sent per endpoint and status code",
+                "# TYPE issue_migration_requests_total counter"
+            ]
+            for name, endpoint in sorted(self.endpoints.items()):
+                for status, count in sorted(endpoint.statuses.items(), key = lambda item: str(item[0])):
+                    lines.append(f'issue_migration_requests_total{{endpoint="{name}",status="{status}"}} {count}')
+
+            lines.append("# HELP issue_migration_request_bytes_total Request body bytes sent per endpoint")
+            lines.append("# TYPE issue_migration_request_bytes_total counter")
+            for name, endpoint in sorted(self.endpoints.items()):
+                lines.append(f'issue_migration_request_bytes_total{{endpoint="{name}"}} {endpoint.bytes_sent}')
+
+            lines.append("# HELP issue_migration_response_bytes_total Response body bytes received per endpoint")
+            lines.append("# TYPE issue_migration_response_bytes_total counter")
+            for name, endpoint in sorted(self.endpoints.items()):
+                lines.append(f'issue_migration_response_bytes_total{{endpoint="{name}"}} {endpoint.bytes_received}')
+
+            lines.append("# HELP issue_migration_request_duration_seconds Request latency per endpoint")
+            lines.append("# TYPE issue_migration_request_duration_seconds histogram")
+            for name, endpoint in sorted(self.endpoints.items()):
+                cumulative = 0
+                for bound, count in zip(list(LATENCY_BUCKETS) + ["+Inf"], endpoint.latency_buckets):
+                    cumulative += count
+                    lines.append(f'issue_migration_request_duration_seconds_bucket{{endpoint="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'issue_migration_request_duration_seconds_sum{{endpoint="{name}"}} {endpoint.latency_sum}')
+                lines.append(f'issue_migration_request_duration_seconds_count{{endpoint="{name}"}} {endpoint.requests}')
+
+        return "\n".join(lines) + "\n"
+
+    def write_summary(self, path):
+        write_atomic(path, json.dumps(self.summary(), indent = 2))
+
+    def write_prometheus(self, path):
+        write_atomic(path, self.to_prometheus())
+
+    def start_exporter(self, path, interval = DEFAULT_PROMETHEUS_INTERVAL):
+        """
+        Rewrites the Prometheus textfile at `path` every `interval` seconds (E.g for the
+        node_exporter textfile collector) until stop_exporter is called
+        """
+        self.exporter = PrometheusExporter(self, path, interval)
+        self.exporter.start()
+
+    def stop_exporter(self):
+        if self.exporter is not None:
+            self.exporter.stop()
+            self.exporter = None
+
+class PrometheusExporter(threading.Thread):
+
+    def __init__(self, metrics, path, interval):
+        super().__init__(daemon = True)
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.metrics.write_prometheus(self.path)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.metrics.write_prometheus(self.path)
+
+def write_atomic(path, content):
+    # Readers never see a half-written file
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, "w") as file:
+        file.write(content)
+    os.replace(tmp_path, path)
@@ -0,0 +1,66 @@
+from concurrent.futures import ProcessPoolExecutor
+from processor import normalize_issue
+import json
+
+def check_payload(payload, issueData):
+    if "error" in payload:
+        return payload["error"]
+    if "exception" in payload and payload["exception"] is None:
+        return f'Could not normalize issue payload with ID {issueData["id"]} - Skipping...'
+    return None
+
+def normalize_event_bytes(event_bytes, issueData):
+    """
+    Runs in a worker process: parses the raw latest event, normalizes it and returns
+    the serialized payload, so the main process never parses or serializes it
+    """
+    payload = normalize_issue(json.loads(event_bytes) if event_bytes is not None else None, issueData)
+    error = check_payload(payload, issueData)
+    if error is not None:
+        return { "error" : error }
+
+    return {
+        "event_id" : payload["event_id"],
+        "payload" : None,
+        "body" : json.dumps(payload).encode("utf-8")
+    }
+
+class InlineNormalizer:
+    """
+    Normalizes events in the calling thread (Default)
+    """
+
+    raw = False
+
+    def normalize(self, event, issueData):
+        payload = normalize_issue(event, issueData)
+        error = check_payload(payload, issueData)
+        if error is not None:
+            return { "error" : error }
+
+        return {
+            "event_id" : payload["event_id"],
+            "payload" : payload,
+            "body" : None
+        }
+
+    def close(self):
+        pass
+
+class ProcessNormalizer:
+    """
+    Normalizes events in a pool of worker processes, so CPU-heavy events do not hold
+    the GIL of the fetch/store threads. Takes the raw event bytes and returns the
+    serialized payload bytes.
+    """
+
+    raw = True
+
+    def __init__(self, workers):
+        self.executor = ProcessPoolExecutor(max_workers = workers)
+
+    def normalize(self, event_bytes, issueData):
+        return self.executor.submit(normalize_event_bytes, event_bytes, issueData).result()
+
+    def close(self):
+        self.executor.shutdown()
@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+
+def ordered_map(func, items, concurrency = 1, window = None):
+    """
+    Yields func(item) for every item, in the same order as `items`, running up
+    to `concurrency` calls at once and keeping at most `window` items in flight.
+    """
+    if concurrency is None or concurrency <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    window = window or concurrency * 2
+    with ThreadPoolExecutor(max_workers = concurrency) as executor:
+        in_flight = deque()
+        for item in items:
+            in_flight.append(executor.submit(func, item))
+            if len(in_flight) >= window:
+                yield in_flight.popleft().result()
+
+        while len(in_flight) > 0:
+            yield in_flight.popleft().result()
+
+def batched(items, size):
+    """
+    Yields lists of up to `size` items, consuming `items` lazily
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+
+    if len(batch) > 0:
+        yield batch
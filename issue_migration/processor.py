@@ -1,4 +1,14 @@
 from sentry import utils
+import uuid
+
+MIGRATION_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "https://sentry.io/issue-migration/")
+
+def get_event_id(migration_id, onprem_issue_id, onprem_event_id):
+    """
+    Deterministic SaaS event ID for a migrated event, so retries store the same event
+    and the ID can be known without asking SaaS
+    """
+    return uuid.uuid5(MIGRATION_NAMESPACE, f'{migration_id}:{onprem_issue_id}:{onprem_event_id}').hex
 
 def normalize_issue(eventData, issueData):
     payload = {}
@@ -11,16 +21,24 @@ def normalize_issue(eventData, issueData):
                 "error" : "Event does not have type 'exception' or 'stacktrace'"
             }
         
+        payload["event_id"] = get_event_id(issueData["migration_id"], issueData["id"], eventData.get("eventID") or eventData.get("id"))
         payload["level"] = issueData["level"]
         payload["platform"] = eventData["platform"]
         payload["timestamp"] = eventData["dateCreated"]
         payload["sdk"] = eventData["sdk"]
-        payload["tags"] = normalize_tags(eventData["tags"])
+        tags = normalize_tags(eventData["tags"])
+        # Read before the migration tags are added, so the event tags are only scanned once
+        environment = tags.get("environment")
+        release = tags.get("release")
+        payload["tags"] = tags
         payload["tags"]["onprem_id"] = issueData["id"]
         payload["tags"]["migration_id"] = issueData["migration_id"]
         payload["tags"]["firstSeen"] = issueData['firstSeen']
         payload["tags"]["firstRelease"] = issueData["release"]["first"] if "first" in issueData["release"] else None
         payload["tags"]["migrated"] = "true"
+        if issueData.get("fingerprint"):
+            # Group every migrated event of an on-prem issue into the same SaaS issue
+            payload["fingerprint"] = ["onprem", str(issueData["id"])]
         payload["contexts"] = eventData["contexts"]
         payload["message"] = eventData["message"] if "message" in eventData else ""
         timestamps = {
@@ -29,15 +47,6 @@ def normalize_issue(eventData, issueData):
             "realTimestamp" : eventData["dateCreated"]
         }
         payload["contexts"]["timestamps"] = timestamps
-        environment = None
-        release = None
-
-        for attr in eventData["tags"] : 
-            if attr["key"] == "environment" :
-                environment = attr["value"]
-            if attr["key"] == "release":
-                release = attr["value"]
-
         payload["environment"] = environment
         payload["release"] = release
 
@@ -101,31 +110,30 @@ def normalize_tags(tags):
     return obj
 
 def normalize_stacktrace(stacktrace, platform): 
-    payload = {
-        "frames" : []
-    }
-
     if stacktrace is None:
-        return payload
+        return {
+            "frames" : []
+        }
 
     frames = stacktrace
     if "frames" in stacktrace:
         frames = stacktrace["frames"]
-    
+
+    with_context = platform == "python"
+    normalized_frames = []
+    append = normalized_frames.append
     for frame in frames:
-        obj = {}
-        obj["filename"] = frame["filename"]
-        obj["function"] = frame["function"]
-        obj["lineno"] = frame["lineNo"]
-        obj["colno"] = frame["colNo"]
-
-        if platform == "python":
-            context_all = get_all_context_attr(frame)
-            if context_all is not None:
-                obj["pre_context"] = context_all["pre_context"]
-                obj["context_line"] = context_all["context_line"]
-                obj["post_context"] = context_all["post_context"]
-        
+        obj = {
+            "filename" : frame["filename"],
+            "function" : frame["function"],
+            "lineno" : frame["lineNo"],
+            "colno" : frame["colNo"]
+        }
+
+        if with_context:
+            set_context_attrs(frame, obj)
+
+        # An explicit chain of checks is faster in CPython than looping over a field table
         if "module" in frame:
             obj["module"] = frame["module"]
         if "package" in frame:
@@ -146,19 +154,24 @@ def normalize_stacktrace(stacktrace, platform):
             obj["trust"] = frame["trust"]
         if "inApp" in frame:
             obj["in_app"] = frame["inApp"]
-        if "in_app" in frame and "inApp" not in frame:
+        elif "in_app" in frame:
             obj["in_app"] = frame["in_app"]
 
-        payload["frames"].append(obj)
-    
-    return payload
+        append(obj)
+
+    return {
+        "frames" : normalized_frames
+    }
+
+def set_context_attrs(frame, obj):
+    context_all = get_all_context_attr(frame)
+    if context_all is not None:
+        obj["pre_context"] = context_all["pre_context"]
+        obj["context_line"] = context_all["context_line"]
+        obj["post_context"] = context_all["post_context"]
 
 def get_all_context_attr(frame):
-    pre_context = []
-    context = None
-    post_context = []
-    properties = ["pre_context", "post_context", "context_line"]
-    if all(prop in frame for prop in properties):
+    if "pre_context" in frame and "post_context" in frame and "context_line" in frame:
         return {
             "pre_context" : frame["pre_context"],
             "context_line" : frame["context_line"],
@@ -167,17 +180,18 @@ def get_all_context_attr(frame):
 
     if check_context_attrs(frame):
         if ("e" in frame["vars"]) or ("err" in frame["vars"]):
+            pre_context = []
+            context = None
+            post_context = []
             error_line = frame["vars"]["e"] if "e" in frame["vars"] else frame["vars"]["err"]
-            context_line = utils.replace_all(error_line, [" ", "'", '"']).lower()
+            context_line = strip_context_line(error_line)
             for line in frame["context"]:
-                formatted_str = utils.replace_all(line[1], [" ", "'", '"']).lower()
-                if context_line in formatted_str:
+                if context_line in strip_context_line(line[1]):
                     context = line[1]
+                elif context is None:
+                    pre_context.append(line[1])
                 else:
-                    if context is None:
-                        pre_context.append(line[1])
-                    else:
-                        post_context.append(line[1])
+                    post_context.append(line[1])
             return {
                 "pre_context" : pre_context,
                 "context_line" : context,
@@ -195,6 +209,10 @@ def get_all_context_attr(frame):
 
     return None
 
+def strip_context_line(line):
+    # Same as utils.replace_all(line, [" ", "'", '"']).lower(), without the loop
+    return line.replace(" ", "").replace("'", "").replace('"', "").lower()
+
 def check_context_attrs(frame):
     return ("context" in frame and frame["context"] is not None) and ("vars" in frame and frame["vars"] is not None)
 
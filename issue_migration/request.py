@@ -1,21 +1,118 @@
 import requests
 import os
+import time
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from metrics import Metrics
+from scheduler import get_retry_after
 
-def request(url, method, payload = None):
-    load_dotenv()
-    try:
-        token = os.environ["SAAS_AUTH_TOKEN"] if "sentry.io" in url else os.environ["ON_PREM_AUTH_TOKEN"]
-        headers = {
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_BACKOFF = 1
+
+class Client:
+    """
+    Long-lived HTTP client that keeps one pooled, keep-alive session per host
+    (on-prem and SaaS) so connections are reused across requests.
+    """
+
+    def __init__(self, pool_size = None, timeout = None, scheduler = None, max_retries = None, metrics = None):
+        load_dotenv()
+        self.pool_size = pool_size or int(os.environ.get("REQUEST_POOL_SIZE", DEFAULT_POOL_SIZE))
+        self.timeout = timeout or (
+            float(os.environ.get("REQUEST_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)),
+            float(os.environ.get("REQUEST_READ_TIMEOUT", DEFAULT_READ_TIMEOUT))
+        )
+        # 429 responses are retried once the scheduler lets the endpoint through again, or
+        # without one, after the Retry-After delay (Exponential backoff if the response has none)
+        self.scheduler = scheduler
+        self.max_retries = max_retries if max_retries is not None else int(os.environ.get("REQUEST_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+        self.metrics = metrics or Metrics()
+        self.sessions = {}
+
+    def get_session(self, url):
+        parsed_url = urlparse(url)
+        host = f'{parsed_url.scheme}://{parsed_url.netloc}'
+        session = self.sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections = 1, pool_maxsize = self.pool_size)
+            session.mount(host, adapter)
+            session.headers.update({
                 "Content-Type": "application/json",
-            }
-        if method == "GET":
-            headers["Authorization"] = "Bearer " + token
-            return requests.get(url, headers = headers)
-        elif method == "POST":
-            return requests.post(url, json = payload)
-        elif method == "PUT":
-            headers["Authorization"] = "Bearer " + token
-            return requests.put(url, json = payload, headers = headers)
-    except Exception as e:
-        raise Exception(f'Could not make request to {url} - Reason: {str(e)}')
+                "Connection": "keep-alive"
+            })
+            session = self.sessions.setdefault(host, session)
+        return session
+
+    def get_token(self, url):
+        # `import` only talks to SaaS, so on-prem may not be configured
+        if "sentry.io" in url or "ON_PREM_AUTH_TOKEN" not in os.environ:
+            return os.environ["SAAS_AUTH_TOKEN"]
+        return os.environ["ON_PREM_AUTH_TOKEN"]
+
+    def request(self, url, method, payload = None, data = None, headers = None):
+        try:
+            for attempt in range(self.max_retries + 1):
+                response = self.send(url, method, payload, data, headers)
+                if response is None or response.status_code != 429:
+                    break
+                if self.scheduler is None and attempt < self.max_retries:
+                    time.sleep(self.get_retry_delay(response, attempt))
+            return response
+        except Exception as e:
+            raise Exception(f'Could not make request to {url} - Reason: {str(e)}')
+
+    def get_retry_delay(self, response, attempt):
+        retry_after = get_retry_after(response)
+        if retry_after is not None:
+            return retry_after
+        return DEFAULT_RETRY_BACKOFF * 2 ** attempt
+
+    def send(self, url, method, payload = None, data = None, headers = None):
+        group = self.scheduler.acquire(url) if self.scheduler is not None else None
+        response = None
+        start_time = time.monotonic()
+        try:
+            session = self.get_session(url)
+            if method == "GET":
+                headers = {"Authorization": "Bearer " + self.get_token(url)}
+                response = session.get(url, headers = headers, timeout = self.timeout)
+            elif method == "POST":
+                response = session.post(url, json = payload, data = data, headers = headers, timeout = self.timeout)
+            elif method == "PUT":
+                headers = {"Authorization": "Bearer " + self.get_token(url)}
+                response = session.put(url, json = payload, headers = headers, timeout = self.timeout)
+            return response
+        finally:
+            latency = time.monotonic() - start_time
+            if self.scheduler is not None:
+                self.scheduler.release(group, response, latency)
+            self.record(url, method, response, latency)
+
+    def record(self, url, method, response, latency):
+        if response is None:
+            self.metrics.record(url, method, "error", 0, 0, latency)
+            return
+
+        body = response.request.body if response.request is not None else None
+        self.metrics.record(url, method, response.status_code, len(body) if body is not None else 0, len(response.content), latency)
+
+    def close(self):
+        for session in self.sessions.values():
+            session.close()
+        self.sessions = {}
+
+default_client = None
+
+def get_default_client():
+    global default_client
+    if default_client is None:
+        default_client = Client()
+    return default_client
+
+def request(url, method, payload = None, data = None, headers = None):
+    return get_default_client().request(url, method, payload, data, headers)
@@ -13,12 +13,14 @@ while [ $# -gt 0 ]; do
         v="${1/--/}"
         declare "$v"="$2"
         shift
+    elif [[ $1 == "export" || $1 == "import" ]]; then
+        command=$1
     fi
     shift
 done
 
 if [ $dry == "True" ]; then
-    python3 main.py --dry-run $([ -n "$issues" ] && echo "--issues=$issues") $([ -n "$start" ] && echo "--start=$start") $([ -n "$end" ] && echo "--end=$end") $([ -n "$fetchRelease" ] && echo "--fetchRelease=$fetchRelease")
+    python3 main.py $command --dry-run $([ -n "$issues" ] && echo "--issues=$issues") $([ -n "$issuesFile" ] && echo "--issuesFile=$issuesFile") $([ -n "$start" ] && echo "--start=$start") $([ -n "$end" ] && echo "--end=$end") $([ -n "$fetchRelease" ] && echo "--fetchRelease=$fetchRelease") $([ -n "$concurrency" ] && echo "--concurrency=$concurrency") $([ -n "$serverFilters" ] && echo "--serverFilters=$serverFilters") $([ -n "$resume" ] && echo "--resume=$resume") $([ -n "$transport" ] && echo "--transport=$transport") $([ -n "$dedup" ] && echo "--dedup=$dedup") $([ -n "$fingerprint" ] && echo "--fingerprint=$fingerprint") $([ -n "$normalizeWorkers" ] && echo "--normalizeWorkers=$normalizeWorkers") $([ -n "$archive" ] && echo "--archive=$archive")
 else
-    python3 main.py $([ -n "$issues" ] && echo "--issues=$issues") $([ -n "$start" ] && echo "--start=$start") $([ -n "$end" ] && echo "--end=$end") $([ -n "$fetchRelease" ] && echo "--fetchRelease=$fetchRelease")
+    python3 main.py $command $([ -n "$issues" ] && echo "--issues=$issues") $([ -n "$issuesFile" ] && echo "--issuesFile=$issuesFile") $([ -n "$start" ] && echo "--start=$start") $([ -n "$end" ] && echo "--end=$end") $([ -n "$fetchRelease" ] && echo "--fetchRelease=$fetchRelease") $([ -n "$concurrency" ] && echo "--concurrency=$concurrency") $([ -n "$serverFilters" ] && echo "--serverFilters=$serverFilters") $([ -n "$resume" ] && echo "--resume=$resume") $([ -n "$transport" ] && echo "--transport=$transport") $([ -n "$dedup" ] && echo "--dedup=$dedup") $([ -n "$fingerprint" ] && echo "--fingerprint=$fingerprint") $([ -n "$normalizeWorkers" ] && echo "--normalizeWorkers=$normalizeWorkers") $([ -n "$archive" ] && echo "--archive=$archive")
 fi
@@ -0,0 +1,132 @@
+from urllib.parse import urlparse
+import threading
+import time
+import re
+
+ID_SEGMENT = re.compile(r"/(\d+|[0-9a-f]{32}|[0-9a-f-]{36})(?=/)")
+
+def get_endpoint_group(url):
+    """
+    Groups URLs by endpoint, replacing IDs in the path (E.g /api/0/issues/{id}/events/latest/)
+    """
+    parsed_url = urlparse(url)
+    return f'{parsed_url.netloc}{ID_SEGMENT.sub("/{id}", parsed_url.path)}'
+
+def get_retry_after(response):
+    """
+    Seconds to wait before retrying a rate limited response, from its Retry-After or
+    X-Sentry-Rate-Limit-Reset header (None if it has neither)
+    """
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+
+    reset = response.headers.get("X-Sentry-Rate-Limit-Reset")
+    if reset is not None:
+        return max(float(reset) - time.time(), 1)
+    return None
+
+class EndpointBudget:
+    def __init__(self):
+        self.remaining = None
+        self.reset = None
+        self.blocked_until = 0
+        self.next_request = 0
+
+class RateLimitScheduler:
+    """
+    Paces requests per endpoint group using the X-Sentry-Rate-Limit-* and Retry-After
+    headers, and adapts the number of requests in flight AIMD-style: the limit grows by
+    one per round of healthy responses and halves on 429s or latency spikes, at most once
+    per round trip (Responses to requests sent before the last decrease are not counted
+    again).
+
+    Requests wait for their endpoint group to be ready before taking a slot, so a group
+    that is blocked or paced does not hold up the others.
+    """
+
+    def __init__(self, max_concurrency, min_concurrency = 1, latency_spike_ratio = 3):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency = float(max_concurrency)
+        self.latency_spike_ratio = latency_spike_ratio
+        self.in_flight = 0
+        self.last_decrease = 0
+        self.budgets = {}
+        self.latency = {}
+        self.condition = threading.Condition()
+
+    def get_budget(self, group):
+        budget = self.budgets.get(group)
+        if budget is None:
+            budget = self.budgets.setdefault(group, EndpointBudget())
+        return budget
+
+    def acquire(self, url):
+        group = get_endpoint_group(url)
+        with self.condition:
+            budget = self.get_budget(group)
+            while True:
+                now = time.time()
+                start_at = max(budget.blocked_until, budget.next_request)
+                if start_at > now:
+                    # Woken early by releases, which may also push start_at back (E.g a 429)
+                    self.condition.wait(start_at - now)
+                elif self.in_flight >= int(self.concurrency):
+                    self.condition.wait()
+                else:
+                    break
+
+            self.in_flight += 1
+            budget.next_request = now + self.get_interval(budget, now)
+
+        return group
+
+    def get_interval(self, budget, now):
+        # Spread what is left of the window evenly until it resets, keeping one request in reserve
+        if budget.remaining is None or budget.reset is None or budget.reset <= now:
+            return 0
+        return (budget.reset - now) / max(budget.remaining - 1, 1)
+
+    def release(self, group, response, latency):
+        with self.condition:
+            self.in_flight -= 1
+            budget = self.get_budget(group)
+
+            if response is not None:
+                remaining = response.headers.get("X-Sentry-Rate-Limit-Remaining")
+                reset = response.headers.get("X-Sentry-Rate-Limit-Reset")
+                if remaining is not None and reset is not None:
+                    budget.remaining = int(remaining)
+                    budget.reset = float(reset)
+
+                if response.status_code == 429:
+                    budget.blocked_until = time.time() + self.get_retry_after(response)
+                    self.decrease(latency)
+                elif self.is_latency_spike(group, latency):
+                    self.decrease(latency)
+                else:
+                    self.concurrency = min(self.concurrency + 1 / self.concurrency, self.max_concurrency)
+
+            self.condition.notify_all()
+
+    def get_retry_after(self, response):
+        retry_after = get_retry_after(response)
+        return retry_after if retry_after is not None else 1
+
+    def is_latency_spike(self, group, latency):
+        average = self.latency.get(group)
+        self.latency[group] = latency if average is None else average * 0.9 + latency * 0.1
+        return average is not None and latency > average * self.latency_spike_ratio
+
+    def decrease(self, latency):
+        # A burst of 429s sent at the same concurrency only halves it once
+        sent_at = time.time() - latency
+        if sent_at < self.last_decrease:
+            return
+
+        self.concurrency = max(self.concurrency / 2, self.min_concurrency)
+        self.last_decrease = time.time()
@@ -1,6 +1,15 @@
 from dotenv import load_dotenv
 from sentry import utils
-from request import request
+from sentry.query import IssueQueryBuilder, ClientSideQueryBuilder
+from sentry.cache import Cache
+from sentry.envelope import EnvelopeEncoder
+from request import get_default_client
+from pipeline import ordered_map, batched
+from urllib.parse import urlencode, urlparse
+import threading
+import uuid
+import math
+import json
 import dryable
 import os
 import time
@@ -8,26 +17,60 @@ from halo import Halo
 
 class Sentry:
 
-    def __init__(self):
+    def __init__(self, client = None, query_builder = None, transport = "envelope", fetch_concurrency = 1):
         load_dotenv()
-        self.request_timeout = 40
-        attributes = utils.get_attributes_from_dsn(os.environ["SAAS_PROJECT_DSN"])
-        self.saas_options = {
-            "endpoint" : f'https://{attributes.group(2)}/api/',
-            "url" : os.environ["SAAS_URL"],
-            "auth_token" : os.environ["SAAS_AUTH_TOKEN"],
-            "org_name" : os.environ["SAAS_ORG_NAME"],
-            "project_name" : os.environ["SAAS_PROJECT_NAME"],
-            "sentry_key" : attributes.group(1),
-            "project_key" : attributes.group(3)
+        self.client = client or get_default_client()
+        self.query_builder = query_builder or IssueQueryBuilder()
+        self.transport = transport
+        self.fetch_concurrency = fetch_concurrency
+        self.upload_lock = threading.Lock()
+        self.upload_stats = {
+            "events" : 0,
+            "raw_bytes" : 0,
+            "sent_bytes" : 0
         }
-
-        self.on_prem_options = {
-            "auth_token" : os.environ["ON_PREM_AUTH_TOKEN"],
-            "url" : os.environ["ON_PREM_URL"],
-            "org_name" : os.environ["ON_PREM_ORG_NAME"],
-            "project_name" : os.environ["ON_PREM_PROJECT_NAME"]
+        self.cache = Cache(
+            max_size = int(os.environ.get("CACHE_MAX_SIZE", 10000)),
+            ttl = int(os.environ.get("CACHE_TTL", 3600))
+        )
+        self.fetch_lock = threading.Lock()
+        # IDs passed with --issues/--issuesFile that on-prem did not return
+        self.missing_issue_ids = []
+        self.issue_fetch_stats = {
+            "ids" : 0,
+            "pages" : 0,
+            "bytes" : 0,
+            "issues" : 0
         }
+        self.request_timeout = 40
+        self.resolve_batch_size = 100
+        self.resolve_concurrency = 4
+        self.failed_events_page_budget = int(os.environ.get("FAILED_EVENTS_PAGE_BUDGET", 100))
+
+        # `export` only needs on-prem and `import` only needs SaaS, so either side can be left unset
+        self.envelope_encoder = None
+        self.saas_options = None
+        if "SAAS_PROJECT_DSN" in os.environ:
+            self.envelope_encoder = EnvelopeEncoder(os.environ["SAAS_PROJECT_DSN"], os.environ.get("ENVELOPE_COMPRESSION", "gzip"))
+            attributes = utils.get_attributes_from_dsn(os.environ["SAAS_PROJECT_DSN"])
+            self.saas_options = {
+                "endpoint" : f'{urlparse(os.environ["SAAS_PROJECT_DSN"]).scheme}://{attributes.group(2)}/api/',
+                "url" : os.environ["SAAS_URL"],
+                "auth_token" : os.environ["SAAS_AUTH_TOKEN"],
+                "org_name" : os.environ["SAAS_ORG_NAME"],
+                "project_name" : os.environ["SAAS_PROJECT_NAME"],
+                "sentry_key" : attributes.group(1),
+                "project_key" : attributes.group(3)
+            }
+
+        self.on_prem_options = None
+        if "ON_PREM_URL" in os.environ:
+            self.on_prem_options = {
+                "auth_token" : os.environ["ON_PREM_AUTH_TOKEN"],
+                "url" : os.environ["ON_PREM_URL"],
+                "org_name" : os.environ["ON_PREM_ORG_NAME"],
+                "project_name" : os.environ["ON_PREM_PROJECT_NAME"]
+            }
 
     def get_sass_project_name(self):
         return self.saas_options["project_name"]
@@ -36,8 +79,11 @@ class Sentry:
         return self.on_prem_options["project_name"]
 
     def get_org_members(self):
+        return self.cache.get_or_load("org_members", self.fetch_org_members)
+
+    def fetch_org_members(self):
         url = f'{self.saas_options["url"]}organizations/{self.saas_options["org_name"]}/users/'
-        response = request(url, method = "GET")
+        response = self.client.request(url, method = "GET")
         members = []
         if response is not None and response.status_code == 200:
             members = members + response.json()
@@ -56,8 +102,11 @@ class Sentry:
         raise Exception(f'Could not fetch {self.saas_options["org_name"]} members')
 
     def get_org_teams(self):
+        return self.cache.get_or_load("org_teams", self.fetch_org_teams)
+
+    def fetch_org_teams(self):
         url = f'{self.saas_options["url"]}organizations/{self.saas_options["org_name"]}/teams/'
-        response = request(url, method = "GET")
+        response = self.client.request(url, method = "GET")
         teams = []
         if response is not None and response.status_code == 200:
             teams = teams + response.json()
@@ -74,106 +123,240 @@ class Sentry:
         raise Exception(f'Could not fetch {self.saas_options["org_name"]} teams')
 
     def get_issues_to_migrate(self, filters):
-       
-        issues = []
-
+        """
+        Yields the issues to migrate as pages arrive from on-prem, filtered inline
+        """
         if "start" in filters:
-            url = f'{self.on_prem_options["url"]}projects/{self.on_prem_options["org_name"]}/{self.on_prem_options["project_name"]}/issues/'
+            yield from self.get_issues_in_range(filters)
+        elif "issues" in filters and filters["issues"] is not None:
+            yield from self.get_issues_from_ids(filters)
+
+    def get_issues_in_range(self, filters):
+        start = filters["start"]
+        for params in self.query_builder.build(filters):
+            for data in self.get_issue_pages(params):
+                # Server-side filters already matched the range, this is the safety net for the client-side builder
+                yield from utils.filter_issues(data, filters)
+
+                # Issues are sorted by lastSeen, so once a whole page is older than start there is nothing left to fetch
+                last_seen = [utils.parse_string_date(issue["lastSeen"]) for issue in data]
+                if not any(date is not None and date >= start for date in last_seen):
+                    break
+
+    def get_issues_from_ids(self, filters):
+        """
+        Yields the issues of a list or a stream of IDs (E.g utils.read_issue_ids), reading
+        the IDs lazily. Batches of IDs (One `issue.id:[...]` query each) are fetched up to
+        `fetch_concurrency` at a time, in the order of the IDs
+        """
+        def fetch_batch(batch):
+            with self.fetch_lock:
+                self.issue_fetch_stats["ids"] += len(batch)
+
+            queries = self.query_builder.build(dict(filters, issues = batch))
+            if queries is None:
+                return [self.get_issue_details(id) for id in batch]
+
+            issue_ids = set(str(id) for id in batch)
+            issues = []
+            for params in queries:
+                for data in self.get_issue_pages(params):
+                    issues.extend(issue for issue in data if issue["id"] in issue_ids)
+
+            found = set(issue["id"] for issue in issues)
+            missing = [str(id) for id in batch if str(id) not in found]
+            if len(missing) > 0:
+                with self.fetch_lock:
+                    self.missing_issue_ids.extend(missing)
+            return issues
+
+        batches = batched(filters["issues"], self.query_builder.batch_size)
+        for issues in ordered_map(fetch_batch, batches, self.fetch_concurrency, window = self.fetch_concurrency):
+            yield from issues
+
+    def get_issue_pages(self, params):
+        url = f'{self.on_prem_options["url"]}projects/{self.on_prem_options["org_name"]}/{self.on_prem_options["project_name"]}/issues/'
+        if len(params) > 0:
+            url = f'{url}?{urlencode(params)}'
+
+        next = True
+        while next:
             response = self.make_issues_request(url)
             data = response.json()
-            last_event_last_seen = utils.parse_string_date(data[-1]["lastSeen"])
-            first_event_last_seen = utils.parse_string_date(data[0]["lastSeen"])
-            not_in_range = filters["start"] < last_event_last_seen or filters["end"] > first_event_last_seen
+            with self.fetch_lock:
+                self.issue_fetch_stats["pages"] += 1
+                self.issue_fetch_stats["bytes"] += len(response.content)
+                self.issue_fetch_stats["issues"] += len(data)
+            yield data
+
+            url = response.links.get('next', {}).get('url')
             next = response.links.get('next', {}).get('results') == 'true'
-            spinner = Halo(text="Loading", spinner="dots")
 
-            if not_in_range == False or next == False:
-                issues = data
+    def get_issue_count(self, params):
+        url = f'{self.on_prem_options["url"]}projects/{self.on_prem_options["org_name"]}/{self.on_prem_options["project_name"]}/issues/?{urlencode(dict(params, limit = 1))}'
+        response = self.client.request(url, method = "GET")
+        if response is not None and response.status_code == 200 and "X-Hits" in response.headers:
+            return int(response.headers["X-Hits"])
 
-            while not_in_range and next:
-                spinner.start()
-                next = response.links.get('next', {}).get('results') == 'true'
-                if next:
-                    url = response.links.get('next', {}).get('url')
-                    response = self.make_issues_request(url)
-                    data = response.json()
-                    issues = issues + data
-                    last_event_last_seen = utils.parse_string_date(data[-1]["lastSeen"])
-                    first_event_last_seen = utils.parse_string_date(data[0]["lastSeen"])
-                    not_in_range = filters["start"] < last_event_last_seen or filters["end"] > first_event_last_seen
-            
-            count = 0
-            while filters["fetch_release"] and count < len(data):
-                base_url = f'{self.on_prem_options["url"]}issues/{data[count]["id"]}/'
-                response = self.make_issues_request(base_url)
-                data[count] = response.json()
-                count = count+1
-
-            spinner.stop()
+        return None
 
-        elif "issues" in filters and filters["issues"] is not None:
-            base_url = f'{self.on_prem_options["url"]}issues/'
-            for id in filters["issues"]:
-                url = base_url + f'{id}/'
-                response = self.make_issues_request(url)
-                data = response.json()
-                issues.append(data)
+    def estimate_unfiltered_fetch(self, filters):
+        """
+        Estimates the pages and bytes the same fetch would have moved if every filter was applied client-side
+        """
+        if "issues" in filters and filters["issues"] is not None:
+            issue_count = self.issue_fetch_stats["ids"]
+            pages = issue_count
+        else:
+            issue_count = self.get_issue_count({})
+            if issue_count is None:
+                return None
+            pages = math.ceil(issue_count / ClientSideQueryBuilder.page_size)
+
+        bytes_per_issue = self.issue_fetch_stats["bytes"] / max(self.issue_fetch_stats["issues"], 1)
+        return {
+            "pages" : pages,
+            "bytes" : int(issue_count * bytes_per_issue)
+        }
 
-        return utils.filter_issues(issues, filters)
+    def get_issue_details(self, id):
+        url = f'{self.on_prem_options["url"]}issues/{id}/'
+        response = self.make_issues_request(url)
+        return response.json()
 
     def make_issues_request(self, url):
-        response = request(url, method = "GET")
+        response = self.client.request(url, method = "GET")
         if response is not None and response.status_code == 200:
             return response
 
         print(response.json())
         raise Exception(f'Could not get issues from on-prem {self.on_prem_options["project_name"]}')
     
-    def get_issue_by_id(self, issue_id):
-        if id is not None:
-            url = f'{self.saas_options["url"]}organizations/{self.saas_options["org_name"]}/events/?query=onprem_id:{issue_id}&field=id'
-            response = request(url, method = "GET")
-            if response is not None and response.status_code == 200:
-                return response.json()
+    def get_existing_issue_ids(self, onprem_ids):
+        """
+        Returns a map of on-prem issue ID -> SaaS issue ID for the given on-prem issues that were already migrated
+        """
+        params = {
+            "query" : f'onprem_id:[{",".join(str(id) for id in onprem_ids)}]',
+            "field" : ["onprem_id", "issue.id", "count()"],
+            "statsPeriod" : "90d",
+            "per_page" : 100
+        }
+        url = f'{self.saas_options["url"]}organizations/{self.saas_options["org_name"]}/events/?{urlencode(params, doseq = True)}'
+        existing = {}
+        next = True
+        while next:
+            response = self.client.request(url, method = "GET")
+            if response is None or response.status_code != 200:
+                raise Exception(f'Could not check if issues already exist with on prem ids {onprem_ids}')
+
+            for row in response.json()["data"]:
+                if row.get("issue.id") is not None:
+                    existing.setdefault(str(row["onprem_id"]), str(row["issue.id"]))
+
+            url = response.links.get('next', {}).get('url')
+            next = response.links.get('next', {}).get('results') == 'true'
+
+        return existing
 
-        raise Exception(f'Could not check if issue already exists with on prem id {issue_id}')
+    def get_tag_value_count(self, key):
+        """
+        Returns how many distinct values a tag has in the SaaS project
+        """
+        url = f'{self.saas_options["url"]}projects/{self.saas_options["org_name"]}/{self.saas_options["project_name"]}/tags/{key}/'
+        response = self.client.request(url, method = "GET")
+        if response is not None and response.status_code == 200:
+            return response.json()["uniqueValues"]
+        if response is not None and response.status_code == 404:
+            # The tag was never stored in the project
+            return 0
+
+        raise Exception(f'Could not fetch {key} tag from SaaS {self.saas_options["project_name"]}')
+
+    def get_tag_values(self, key, since = None):
+        """
+        Yields the values of a tag in the SaaS project, most recently seen first, and
+        stops once values were last seen before `since`
+        """
+        params = {
+            "sort" : "-last_seen"
+        }
+        url = f'{self.saas_options["url"]}projects/{self.saas_options["org_name"]}/{self.saas_options["project_name"]}/tags/{key}/values/?{urlencode(params)}'
+        next = True
+        while next:
+            response = self.client.request(url, method = "GET")
+            if response is None or response.status_code != 200:
+                raise Exception(f'Could not fetch {key} tag values from SaaS {self.saas_options["project_name"]}')
+
+            for value in response.json():
+                if since is not None and value["lastSeen"] < since:
+                    return
+                yield value
+
+            url = response.links.get('next', {}).get('url')
+            next = response.links.get('next', {}).get('results') == 'true'
 
-    def get_latest_event_from_issue(self, id):
+    def get_latest_event_from_issue(self, id, raw = False):
         if id is not None:
             url = f'{self.on_prem_options["url"]}issues/{id}/events/latest/'
-            response = request(url, method = "GET")
+            response = self.client.request(url, method = "GET")
             if response is not None and response.status_code == 200:
-                return response.json()
+                return response.content if raw else response.json()
             else:
                 print(response.json())
 
         raise Exception(f'Could not get latest event from on-prem {self.on_prem_options["org_name"]} with issue ID {id}')
 
-    def get_issue_releases(self, id):
+    def get_issue_release_versions(self, id):
+        """
+        Returns the release versions of an issue (E.g `{ "first" : "app@1.0.0" }`). Only the
+        versions are cached, and concurrent lookups of the same issue share one request
+        """
+        if id is not None:
+            return self.cache.get_or_load(("issue_releases", str(id)), lambda: self.fetch_issue_release_versions(id))
+        return None
+
+    def fetch_issue_release_versions(self, id):
+        releases = self.fetch_issue_releases(id)
+        versions = {}
+        if releases is not None and len(releases) != 0 and releases.get("firstRelease") is not None:
+            versions["first"] = releases["firstRelease"]["shortVersion"]
+
+        return versions
+
+    def fetch_issue_releases(self, id):
         if id is not None:
             url = f'{self.on_prem_options["url"]}issues/{id}/first-last-release/'
-            response = request(url, method = "GET")
+            response = self.client.request(url, method = "GET")
             if response is not None and response.status_code == 200:
                 return response.json()
-            elif response.status_code != 404:
+            elif response is not None and response.status_code != 404:
                 print(response.json())
         
         return None
 
-    def get_issue_id_from_event_id(self, event_id):
-        if id is not None:
-            url = f'{self.saas_options["url"]}projects/{self.saas_options["org_name"]}/{self.saas_options["project_name"]}/events/{event_id}/'
-            response = request(url, method = "GET")
-            if response is not None and response.status_code == 200:
-                return response.json()
-
-        raise Exception(f'Could not get issue info from SaaS event with ID {event_id}')
-
-
     @dryable.Dryable()
     def store_event(self, event):
+        if event.get("event_id") is None:
+            event["event_id"] = uuid.uuid4().hex
+        return self.store_event_body(event["event_id"], json.dumps(event).encode("utf-8"))
+
+    @dryable.Dryable()
+    def store_normalized_event(self, normalized):
+        """
+        Stores the output of a normalizer, which holds either the payload or its serialized bytes
+        """
+        if normalized["body"] is None:
+            return self.store_event(normalized["payload"])
+        return self.store_event_body(normalized["event_id"], normalized["body"])
+
+    def store_event_body(self, event_id, body):
+        if self.transport == "envelope":
+            return self.post_envelope(*self.envelope_encoder.encode_payload(event_id, body))
+
         store_url = f'{self.saas_options["endpoint"]}{self.saas_options["project_key"]}/store/?sentry_key={self.saas_options["sentry_key"]}'
-        response = request(store_url, method = "POST", payload = event)
+        self.record_upload(len(body), len(body))
+        response = self.client.request(store_url, method = "POST", data = body, headers = {"Content-Type": "application/json"})
         if response is not None and response.status_code == 200:
             return response.json()
         else:
@@ -181,9 +364,27 @@ class Sentry:
 
         return None
 
+    def post_envelope(self, event_id, body, raw_size):
+        envelope_url = f'{self.saas_options["endpoint"]}{self.saas_options["project_key"]}/envelope/?sentry_key={self.saas_options["sentry_key"]}'
+        self.record_upload(raw_size, len(body))
+        response = self.client.request(envelope_url, method = "POST", data = body, headers = self.envelope_encoder.get_headers())
+        if response is not None and response.status_code == 200:
+            data = response.json()
+            return { "id" : data.get("id") or event_id }
+        else:
+            print(response.text)
+
+        return None
+
+    def record_upload(self, raw_size, sent_size):
+        with self.upload_lock:
+            self.upload_stats["events"] += 1
+            self.upload_stats["raw_bytes"] += raw_size
+            self.upload_stats["sent_bytes"] += sent_size
+
     def update_issue(self, issue_id, payload):
         url = f'{self.saas_options["url"]}issues/{issue_id}/'
-        response = request(url = url, method = "PUT", payload = payload)
+        response = self.client.request(url = url, method = "PUT", payload = payload)
         if response is not None and response.status_code == 200:
             return response.json()
         else:
@@ -192,83 +393,113 @@ class Sentry:
         return None
     
     def get_issue_ids_from_events(self, eventIDs):
+        """
+        Resolves the SaaS issue ID of each event, querying batches of event IDs at
+        once and polling with exponential backoff only for the ones not ingested yet
+        """
+        resolved, failed_event_ids = self.resolve_issue_ids(eventIDs, self.get_event_issue_ids)
+        return {
+            "issues" : [{ "issue_id" : resolved[eventID], "event_id" : eventID } for eventID in eventIDs if eventID in resolved],
+            "failed_event_ids" : failed_event_ids
+        }
+
+    def get_issue_ids_from_onprem_ids(self, event_ids_by_onprem_id):
+        """
+        Resolves the SaaS issue ID of migrated events through their `onprem_id` tag.
+        Only reliable when events are fingerprinted by on-prem issue, so each one maps to a single SaaS issue
+        """
+        onprem_ids = list(event_ids_by_onprem_id.keys())
+        resolved, failed_onprem_ids = self.resolve_issue_ids(onprem_ids, self.get_existing_issue_ids)
+        return {
+            "issues" : [{ "issue_id" : resolved[id], "event_id" : event_ids_by_onprem_id[id] } for id in onprem_ids if id in resolved],
+            "failed_event_ids" : [event_ids_by_onprem_id[id] for id in failed_onprem_ids]
+        }
+
+    def resolve_issue_ids(self, keys, lookup):
         spinner = Halo(text="Loading", spinner="dots")
         spinner.start()
-        time.sleep(10)
-        failed_event_ids = []
-        issues = []
-        for eventID in eventIDs:
-            url = f'{self.saas_options["url"]}projects/{self.saas_options["org_name"]}/{self.saas_options["project_name"]}/events/{eventID}/'
-            response = request(url, method = "GET")
-            start_time = time.time()
-            if response is not None:
-                data = response.json()
-                while "id" not in data:
-                    time_delta = time.time() - start_time
-                    response = request(url, method = "GET")
-                    data = response.json()
-
-                    if time_delta > self.request_timeout:
-                        print("Timeout reached")
-                        failed_event_ids.append(eventID)
-                        break
-
-                if "groupID" in data:
-                    issues.append({
-                        "issue_id" : data["groupID"],
-                        "event_id" : eventID
-                    })
+        resolved = {}
+        failed = []
+        for result in ordered_map(lambda batch: self.resolve_batch(batch, lookup), batched(keys, self.resolve_batch_size), self.resolve_concurrency):
+            resolved.update(result["resolved"])
+            failed = failed + result["failed"]
         spinner.stop()
 
+        return resolved, failed
+
+    def resolve_batch(self, keys, lookup):
+        pending = set(keys)
+        resolved = {}
+        delay = 1
+        start_time = time.time()
+        while True:
+            resolved.update(lookup(list(pending)))
+            pending = pending - resolved.keys()
+            if len(pending) == 0 or time.time() - start_time + delay > self.request_timeout:
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, 16)
+
+        if len(pending) > 0:
+            print(f'Timeout reached resolving {len(pending)} events')
+
         return {
-            "issues" : issues,
-            "failed_event_ids" : failed_event_ids
+            "resolved" : resolved,
+            "failed" : [key for key in keys if key in pending]
+        }
+
+    def get_event_issue_ids(self, eventIDs):
+        params = {
+            "query" : f'project:{self.saas_options["project_name"]} id:[{",".join(eventIDs)}]',
+            "field" : ["id", "issue.id"],
+            "statsPeriod" : "90d",
+            "per_page" : len(eventIDs)
         }
+        url = f'{self.saas_options["url"]}organizations/{self.saas_options["org_name"]}/events/?{urlencode(params, doseq = True)}'
+        response = self.client.request(url, method = "GET")
+        if response is not None and response.status_code == 200:
+            return { event["id"] : str(event["issue.id"]) for event in response.json()["data"] if event.get("issue.id") is not None }
+
+        return {}
 
-    def get_issue_ids_from_failed_events(self, eventIDs):
+    def get_issue_ids_from_failed_events(self, eventIDs, max_pages = None):
+        """
+        Pages once through the SaaS project events, indexing eventID -> groupID, and
+        stops as soon as every wanted event is found or `max_pages` were read
+        """
         spinner = Halo(text="Loading", spinner="dots")
         spinner.start()
+        max_pages = max_pages or self.failed_events_page_budget
+        wanted = set(eventIDs)
+        index = {}
+        pages = 0
         url = f'{self.saas_options["url"]}projects/{self.saas_options["org_name"]}/{self.saas_options["project_name"]}/events/'
-        response = request(url, method = "GET")
-        events_metadata = []
-        issues = []
-        if response is not None:
-            data = response.json()
-            for event in data:
-                obj = {
-                    "event_id" : event["eventID"],
-                    "issue_id" : event["groupID"]
-                }
-                events_metadata.append(obj)
-
-        for eventID in eventIDs:
-            issue_id = [obj['issue_id'] for obj in events_metadata if obj['event_id'] == eventID]
+        next = True
+        while next and pages < max_pages and len(wanted) > 0:
+            response = self.client.request(url, method = "GET")
+            if response is None or response.status_code != 200:
+                break
+            pages += 1
+
+            for event in response.json():
+                if event["eventID"] in wanted:
+                    index[event["eventID"]] = event["groupID"]
+                    wanted.discard(event["eventID"])
+
+            url = response.links.get('next', {}).get('url')
             next = response.links.get('next', {}).get('results') == 'true'
-            while next and len(issue_id) == 0:
-                url = response.links.get('next', {}).get('url')
-                response = request(url, method = "GET")
-                next = response.links.get('next', {}).get('results') == 'true'
-                data = response.json()
-                issue_id = [obj["groupID"] for obj in data if obj["eventID"] == eventID]
-
-            if issue_id is not None:
-                if len(issue_id) == 1:
-                    issue_id = issue_id[0]
-                obj = {
-                    "issue_id" : issue_id,
-                    "event_id" : eventID
-                }
-                issues.append(obj)
+        spinner.stop()
 
         return {
-            "issues" : issues
+            "issues" : [{ "issue_id" : index[eventID], "event_id" : eventID } for eventID in eventIDs if eventID in index],
+            "unresolved_event_ids" : [eventID for eventID in eventIDs if eventID not in index]
         }
 
-    def get_integration_data(self, integration_name, issue_id):
+    def get_issue_integrations(self, issue_id):
         url = f'{self.on_prem_options["url"]}groups/{issue_id}/integrations/'
-        response = request(url, method = "GET")
+        response = self.client.request(url, method = "GET")
         if response is not None and response.status_code == 200:
-            return self.process_integrations_response(response.json(), integration_name)
+            return response.json()
         
         raise Exception(f'Could not fetch integrations for issue with ID {issue_id}')
     
@@ -286,22 +517,27 @@ class Sentry:
         return { "keys": keys, "raw_data": integrations }
 
     def get_saas_integration_id(self, integration_name, identifer):
+        integrations = self.cache.get_or_load("saas_integrations", self.fetch_saas_integrations)
+        for integration in integrations:
+            if integration["name"].lower() == integration_name.lower() and integration[identifer["key"]] == identifer["value"]:
+                return integration["id"] or None
+
+        raise Exception(f'Could not get integration id for {integration_name} in SaaS {self.saas_options["org_name"]}')
+
+    def fetch_saas_integrations(self):
         url = f'{self.saas_options["url"]}organizations/{self.saas_options["org_name"]}/integrations/?includeConfig=0'
-        response = request(url, method = "GET")
+        response = self.client.request(url, method = "GET")
         if response is not None and response.status_code in [200,201]:
-            data = response.json()
-            for integration in data:
-                if integration["name"].lower() == integration_name.lower() and integration[identifer["key"]] == identifer["value"]:
-                    return integration["id"] or None
+            return response.json()
 
-        raise Exception(f'Could not get integration id for {integration_name} in SaaS {self.saas_options["org_name"]}')
+        raise Exception(f'Could not get integrations in SaaS {self.saas_options["org_name"]}')
 
     def update_external_issues(self, issue_id, integration_data, integration_id):
         url = f'{self.saas_options["url"]}groups/{issue_id}/integrations/{integration_id}/'
         payload = {
             "externalIssue" : integration_data["external_issue"]
         }
-        response = request(url, method = "PUT", payload = payload)
+        response = self.client.request(url, method = "PUT", payload = payload)
         if response is not None and response.status_code in [200,201]:
             return response.json()
         
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+import threading
+import time
+
+class Cache:
+    """
+    Thread-safe per-run cache for idempotent lookups with TTL expiry and LRU eviction.
+    Concurrent misses on the same key only call the loader once.
+    """
+
+    def __init__(self, max_size = 10000, ttl = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[1] > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return True, entry[0]
+                del self.entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last = False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        found, value = self.get(key)
+        if found:
+            return value
+
+        with self.lock:
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another thread may have loaded the value while we waited
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None and entry[1] > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.misses -= 1
+                    self.hits += 1
+                    return entry[0]
+
+            value = loader()
+            self.set(key, value)
+
+        with self.lock:
+            self.key_locks.pop(key, None)
+
+        return value
+
+    def stats(self):
+        with self.lock:
+            return {
+                "size" : len(self.entries),
+                "hits" : self.hits,
+                "misses" : self.misses,
+                "evictions" : self.evictions
+            }
@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+import threading
+import json
+import zlib
+
+CONTENT_ENCODINGS = {
+    "gzip" : "gzip",
+    "br" : "br",
+    "none" : None
+}
+
+class EnvelopeEncoder:
+    """
+    Builds Sentry envelopes (https://develop.sentry.dev/sdk/envelopes/) for events and
+    compresses them with gzip or brotli. Each worker thread keeps its own compressor
+    setup, which is copied for every envelope instead of being rebuilt.
+    """
+
+    def __init__(self, dsn, compression = "gzip", level = 6):
+        if compression not in CONTENT_ENCODINGS:
+            raise Exception(f'Invalid envelope compression {compression} - Valid values are gzip, br or none')
+
+        if compression == "br":
+            try:
+                import brotli
+            except ImportError:
+                raise Exception("brotli compression requires the `brotli` package - Run `pip install brotli`")
+            self.brotli = brotli
+
+        self.dsn = dsn
+        self.compression = compression
+        self.level = level
+        self.local = threading.local()
+
+    def get_headers(self):
+        headers = {"Content-Type": "application/x-sentry-envelope"}
+        if CONTENT_ENCODINGS[self.compression] is not None:
+            headers["Content-Encoding"] = CONTENT_ENCODINGS[self.compression]
+        return headers
+
+    def encode_payload(self, event_id, payload):
+        envelope_header = {
+            "event_id" : event_id,
+            "dsn" : self.dsn,
+            "sent_at" : datetime.now(timezone.utc).isoformat()
+        }
+        item_header = {
+            "type" : "event",
+            "length" : len(payload),
+            "content_type" : "application/json"
+        }
+        envelope = json.dumps(envelope_header).encode("utf-8") + b"\n" + json.dumps(item_header).encode("utf-8") + b"\n" + payload
+        return event_id, self.compress(envelope), len(envelope)
+
+    def compress(self, data):
+        if self.compression == "gzip":
+            template = getattr(self.local, "compressor", None)
+            if template is None:
+                # wbits=31 writes the gzip header and trailer
+                template = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+                self.local.compressor = template
+            compressor = template.copy()
+            return compressor.compress(data) + compressor.flush()
+        elif self.compression == "br":
+            return self.brotli.compress(data, quality = min(self.level, 11))
+
+        return data
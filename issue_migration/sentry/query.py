@@ -0,0 +1,57 @@
+from datetime import timedelta
+from pipeline import batched
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+class ClientSideQueryBuilder:
+    """
+    Fetches issues without any server-side query and leaves all filtering to
+    utils.filter_issues, which Sentry.get_issues_in_range runs on every page
+    (Previous behaviour - useful for instances that do not support issue search syntax)
+    """
+
+    page_size = DEFAULT_PAGE_SIZE
+    # Issues are fetched one by one, so each ID is its own batch
+    batch_size = 1
+
+    def build(self, filters):
+        if "issues" in filters:
+            # Issues are fetched one by one from issues/<id>/
+            return None
+        return [{}]
+
+class IssueQueryBuilder(ClientSideQueryBuilder):
+    """
+    Translates the filters from utils.get_request_filters into query params for
+    the project issues endpoint, so on-prem only returns issues we will migrate.
+    Returns one set of params per query - ID lists are split into batches.
+    """
+
+    page_size = MAX_PAGE_SIZE
+
+    def __init__(self, batch_size = MAX_PAGE_SIZE):
+        self.batch_size = batch_size
+
+    def build(self, filters):
+        if "issues" in filters and filters["issues"] is not None:
+            return [self.build_ids_query(batch) for batch in batched(filters["issues"], self.batch_size)]
+
+        if "start" in filters and filters["start"] is not None:
+            return [self.build_range_query(filters["start"], filters["end"])]
+
+        return [{}]
+
+    def build_range_query(self, start, end):
+        # Without a query the endpoint implies `is:unresolved`, so it is kept to fetch the same issues
+        return {
+            "query" : f'is:unresolved lastSeen:>={start.isoformat()}T00:00:00 lastSeen:<{(end + timedelta(days=1)).isoformat()}T00:00:00',
+            "sort" : "date",
+            "limit" : self.page_size
+        }
+
+    def build_ids_query(self, issue_ids):
+        return {
+            "query" : f'issue.id:[{",".join(str(id) for id in issue_ids)}]',
+            "limit" : self.page_size
+        }
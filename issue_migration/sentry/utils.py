@@ -1,7 +1,8 @@
 import re
 import os
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from dotenv import load_dotenv
+from sentry import query
 
 def get_attributes_from_dsn(dsn):
     if dsn is not None:
@@ -24,53 +25,26 @@ def filter_issues(issues, filters):
         return issues
 
     filtered_issues = []
-    filter = None
-    last_seen = None
-    date_formats = ['%Y-%m-%dT%H:%M:%S%fZ', '%Y-%m-%dT%H:%M:%S.%fZ']
-
     if "start" in filters and filters["start"] is not None:
-        filter = "timerange"
         start = filters["start"]
         if "end" not in filters:
             raise Exception("No end date provided")
         end = filters["end"]
-    
-    for issue in issues:
-        if filter == "timerange":
-            #print(issue)
-            for format in date_formats:
-                try:
-                    last_seen = datetime.strptime(issue["lastSeen"], format).date()
-                except ValueError as e:
-                    #print(f'On-prem issue with ID {issue["id"]} had invalid "lastSeen" value {issue["lastSeen"]}')
-                    pass
 
+        for issue in issues:
+            last_seen = parse_string_date(issue["lastSeen"])
             if last_seen is not None and last_seen >= start and last_seen <= end:
                 filtered_issues.append(issue)
-                
+
     return filtered_issues
 
-def parse_string_date(date):
-    date_formats = ['%Y-%m-%dT%H:%M:%S%fZ', '%Y-%m-%dT%H:%M:%S.%fZ']
-    parsed_date = None
+def parse_string_date(date_string):
+    # lastSeen values are ISO 8601 (E.g 2023-01-01T10:00:00.123Z) so only the date part needs parsing
     try:
-        for format in date_formats:
-            try:
-                parsed_date = datetime.strptime(date, format).date()
-            except ValueError as e:
-                #print(f'On-prem issue with ID {issue["id"]} had invalid "lastSeen" value {issue["lastSeen"]}')
-                continue
-            break
-    except:
-        print("something went wrong")
-    return parsed_date
-
-
-def get_issue_attr(event_id, metadata, attr_name):
-    for data in metadata:
-        if data["event_id"] == event_id:
-            return data[attr_name]
-    return None
+        return date.fromisoformat(date_string[:10])
+    except (ValueError, TypeError):
+        return None
+
 
 def get_dry_run(args):
     if len(args) > 1:
@@ -80,15 +54,22 @@ def get_dry_run(args):
             raise Exception("Invalid argument : To dry-run script, please specify the '--dry-run' argument")
     return False
 
+COMMANDS = ["export", "import"]
+ON_PREM_ENV = ["ON_PREM_AUTH_TOKEN", "ON_PREM_URL", "ON_PREM_ORG_NAME", "ON_PREM_PROJECT_NAME"]
+SAAS_ENV = ["SAAS_AUTH_TOKEN", "SAAS_ORG_NAME", "SAAS_PROJECT_NAME", "SAAS_PROJECT_DSN", "SAAS_URL"]
+
 def process_cli_args(args, logger):
-    valid_args = ["--dry-run", "--start", "--end", "--issues", "--fetchRelease"]
+    valid_args = ["--dry-run", "--start", "--end", "--issues", "--issuesFile", "--fetchRelease", "--concurrency", "--serverFilters", "--resume", "--transport", "--dedup", "--fingerprint", "--normalizeWorkers", "--archive"]
     if "--help" in args:
         print_help_log()
         return False
     args = args[1::]
-    for arg in args:
+    for index, arg in enumerate(args):
         sp = arg.split("=")
-        if sp[0] not in valid_args:
+        if sp[0] in COMMANDS and index != 0:
+            logger.error(f'Invalid argument `{arg}` - Commands have to be the first argument (E.g main.py {arg} --dry-run)')
+            return False
+        if sp[0] not in valid_args and sp[0] not in COMMANDS:
             logger.error(f'Invalid argument `{arg}`')
             print_help_log()
     return args
@@ -106,6 +87,42 @@ def print_help_log():
         },
         {
             "--issues" : "\tList of issues to migrate from on-prem to SaaS"
+        },
+        {
+            "--issuesFile" : "\tFile with the IDs of the issues to migrate, one per line or comma-separated"
+        },
+        {
+            "--fetchRelease" : "\tLook up issue releases in a concurrent stage ahead of the migration (Default: false)"
+        },
+        {
+            "--concurrency" : "\tNumber of issues migrated at the same time (Default: 1)"
+        },
+        {
+            "--serverFilters" : "\tApply start/end/issues filters in the on-prem query (Default: true)"
+        },
+        {
+            "--resume" : "\tMigration ID of an interrupted migration to resume"
+        },
+        {
+            "--transport" : "\tHow events are sent to SaaS: envelope (compressed) or store (Default: envelope)"
+        },
+        {
+            "--dedup" : "\tHow already migrated issues are found: discover or tags (Default: discover)"
+        },
+        {
+            "--fingerprint" : "\tGroup events by on-prem issue in SaaS (Default: false)"
+        },
+        {
+            "--normalizeWorkers" : "\tNumber of processes that normalize events (Default: 0, normalize in the migration threads)"
+        },
+        {
+            "export" : "\t\tWrite the issues from on-prem to an archive instead of migrating them"
+        },
+        {
+            "import" : "\t\tMigrate the issues of an archive to SaaS"
+        },
+        {
+            "--archive" : "\tArchive directory for export and import (Default: ./issue_archive)"
         }
     ]
     print('ARGUMENT \t DESCRIPTION')
@@ -116,11 +133,77 @@ def print_help_log():
             print(f'{key}{i[key]}')
 
 
+def get_cli_arg(cli_args, name, default = None):
+    for arg in cli_args:
+        sp = arg.split("=", 1)
+        if sp[0] == name:
+            return sp[1] if len(sp) > 1 else default
+    return default
+
+def get_command(cli_args):
+    if len(cli_args) > 0 and cli_args[0] in COMMANDS:
+        return cli_args[0]
+    return None
+
+def check_env(command):
+    load_dotenv()
+    required = []
+    if command != "import":
+        required = required + ON_PREM_ENV
+    if command != "export":
+        required = required + SAAS_ENV
+
+    missing = [name for name in required if name not in os.environ]
+    if len(missing) > 0:
+        raise Exception(f'Missing env variables {", ".join(missing)}')
+
+def get_concurrency(cli_args, logger):
+    load_dotenv()
+    value = get_cli_arg(cli_args, "--concurrency", os.environ.get("CONCURRENCY", "1"))
+    try:
+        concurrency = int(value)
+    except ValueError:
+        logger.error(f'Invalid concurrency {value} - Concurrency should be a number')
+        return 1
+
+    if concurrency < 1:
+        logger.error(f'Invalid concurrency {value} - Concurrency should be at least 1')
+        return 1
+    return concurrency
+
+def get_query_builder(cli_args):
+    load_dotenv()
+    server_filters = get_cli_arg(cli_args, "--serverFilters", os.environ.get("SERVER_FILTERS", "true"))
+    if server_filters.lower() == "false":
+        return query.ClientSideQueryBuilder()
+    return query.IssueQueryBuilder()
+
+def get_transport(cli_args, logger):
+    load_dotenv()
+    transport = get_cli_arg(cli_args, "--transport", os.environ.get("TRANSPORT", "envelope")).lower()
+    if transport not in ["envelope", "store"]:
+        logger.error(f'Invalid transport {transport} - Transport should be envelope or store')
+        return "envelope"
+    return transport
+
 def replace_all(str, chars, new_val = ""):
     for char in chars:
         str = str.replace(char, new_val)
     return str
 
+def read_issue_ids(path):
+    """
+    Yields the issue IDs in a file as it is read - One per line or comma-separated.
+    Blank lines, `#` comments and repeated IDs are skipped
+    """
+    seen = set()
+    with open(path) as file:
+        for line in file:
+            for id in re.split(r"[,\s]+", line.split("#", 1)[0]):
+                if id != "" and id not in seen:
+                    seen.add(id)
+                    yield id
+
 def get_request_filters(cli_args, logger):
     load_dotenv()
 
@@ -130,13 +213,16 @@ def get_request_filters(cli_args, logger):
     start = None
     end = None
     issues = None
+    issues_file = None
     fetch_release = False
     date_format = '%Y-%m-%d'
     for arg in cli_args:
         sp = arg.split("=")
         if len(sp) > 1:
-            if "issues" in sp[0]:
+            if sp[0] == "--issues":
                 issues = sp[1].split(",")
+            if sp[0] == "--issuesFile":
+                issues_file = sp[1]
             if "start" in sp[0] or "end" in sp[0]:
                 try:
                     date_object = datetime.strptime(sp[1], date_format)
@@ -150,9 +236,11 @@ def get_request_filters(cli_args, logger):
             if "fetchRelease" in sp[0]:
                 fetch_release = sp[1].lower() == "true"
     
-    if issues is None:
+    if issues is None and issues_file is None:
         if "ISSUES" in os.environ and os.environ["ISSUES"] is not None:
             issues = os.environ["ISSUES"].split(",")
+        elif "ISSUES_FILE" in os.environ:
+            issues_file = os.environ["ISSUES_FILE"]
     if start is None:
         if "START" in os.environ:
             try:
@@ -171,6 +259,15 @@ def get_request_filters(cli_args, logger):
                 return None
 
     
+    if issues is None and issues_file is not None:
+        if not os.path.isfile(issues_file):
+            logger.error(f'Invalid issues file {issues_file} - File does not exist')
+            return None
+        logger.debug(f'Filtering issues based on IDs in {issues_file}')
+        return {
+            "issues" : read_issue_ids(issues_file),
+            "fetch_release": fetch_release
+        }
     if issues is not None:
         logger.debug(f'Filtering issues based on list {str(issues)}')
         return {
@@ -0,0 +1,127 @@
+import gzip
+import json
+import io
+import os
+
+EXTENSIONS = {
+    None : "",
+    "gzip" : ".gz",
+    "zstd" : ".zst"
+}
+
+def encode_record(record):
+    """
+    Serializes `record` as one line of JSON. Values that are already JSON bytes (E.g a raw
+    on-prem event) are written as they are instead of being parsed and serialized again
+    """
+    if not any(isinstance(value, bytes) for value in record.values()):
+        return json.dumps(record).encode("utf-8")
+
+    items = []
+    for key, value in record.items():
+        value = value.replace(b"\n", b" ") if isinstance(value, bytes) else json.dumps(value).encode("utf-8")
+        items.append(json.dumps(key).encode("utf-8") + b": " + value)
+    return b"{" + b", ".join(items) + b"}"
+
+def get_file_name(path, index, compression = None):
+    """
+    Name of the `index`th file of a JsonlWriter (E.g output.jsonl, output.1.jsonl...)
+    """
+    root, extension = os.path.splitext(path)
+    name = path if index == 0 else f'{root}.{index}{extension}'
+    return name + EXTENSIONS[compression]
+
+class JsonlWriter:
+    """
+    Append-only JSON Lines writer. Every record is flushed as soon as it is written
+    and a new file is started once the current one grows past `max_bytes`
+    (E.g output.jsonl, output.1.jsonl, output.2.jsonl...)
+    """
+
+    def __init__(self, path, compression = None, max_bytes = None):
+        if compression not in EXTENSIONS:
+            raise Exception(f'Invalid compression {compression} - Valid values are gzip or zstd')
+
+        self.path = path
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.file_index = 0
+        self.file = None
+        self.file_bytes = 0
+        self.records = 0
+        self.open_next_file()
+
+    def get_file_name(self, index):
+        return get_file_name(self.path, index, self.compression)
+
+    def open_next_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file_index += 1
+
+        file_name = self.get_file_name(self.file_index)
+        directory = os.path.dirname(file_name)
+        if directory != "" and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # Files are appended to, so what earlier runs wrote counts toward max_bytes (Compressed
+        # files are measured by their size on disk, which is less than what they hold)
+        existing_bytes = os.path.getsize(file_name) if os.path.exists(file_name) else 0
+        if self.compression == "gzip":
+            self.file = gzip.open(file_name, "ab")
+        elif self.compression == "zstd":
+            try:
+                import zstandard
+            except ImportError:
+                raise Exception("zstd compression requires the `zstandard` package - Run `pip install zstandard`")
+            self.file = zstandard.ZstdCompressor().stream_writer(open(file_name, "ab"), closefd = True)
+        else:
+            self.file = open(file_name, "ab")
+
+        self.file_name = file_name
+        self.file_bytes = existing_bytes
+
+    def write(self, record):
+        line = encode_record(record) + b"\n"
+        if self.max_bytes is not None and self.file_bytes > 0 and self.file_bytes + len(line) > self.max_bytes:
+            self.open_next_file()
+
+        self.file.write(line)
+        self.file.flush()
+        self.file_bytes += len(line)
+        self.records += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def read_records(file_name, truncated = False):
+    """
+    Yields the records of a file written by JsonlWriter, one line at a time. The
+    compression is picked from the file extension. With `truncated`, the file may
+    end mid-record (E.g its writer was killed) and reading stops at the last
+    complete record
+    """
+    if file_name.endswith(EXTENSIONS["gzip"]):
+        file = gzip.open(file_name, "rb")
+    elif file_name.endswith(EXTENSIONS["zstd"]):
+        try:
+            import zstandard
+        except ImportError:
+            raise Exception("zstd compression requires the `zstandard` package - Run `pip install zstandard`")
+        file = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(file_name, "rb"), closefd = True))
+    else:
+        file = open(file_name, "rb")
+
+    with file:
+        try:
+            for line in file:
+                if truncated and not line.endswith(b"\n"):
+                    return
+                if line.strip() != b"":
+                    yield json.loads(line)
+        except EOFError:
+            # A gzip file that was not closed has no end-of-stream marker
+            if not truncated:
+                raise